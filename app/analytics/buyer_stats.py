@@ -0,0 +1,111 @@
+"""
+Счётчики лидов и заявок байеров с отложенной записью
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import bindparam, func, update
+
+from app.config import BUYER_STATS_FLUSH_INTERVAL
+from app.database.models import Buyer
+from app.database.sqlite_writer import run_write
+
+logger = logging.getLogger(__name__)
+
+
+class BuyerStatsAggregator:
+    """Копит приращения `total_leads`/`total_applications` по `buyer_code`
+
+    Раз в `flush_interval` секунд все накопленное уходит одной транзакцией:
+    по одному атомарному `UPDATE buyers SET total_leads = total_leads + :n`
+    на байера, без чтения строки. Если запись не удалась, приращения
+    возвращаются в буфер до следующего сброса, так что при падении процесса
+    теряется не больше одного интервала.
+    """
+
+    def __init__(self, flush_interval: float = BUYER_STATS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._leads: Counter = Counter()
+        self._applications: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def add(self, buyer_code: str, leads: int = 0, applications: int = 0):
+        """Учесть лиды/заявки байера (без обращения к БД)"""
+        if not buyer_code:
+            return
+        if leads:
+            self._leads[buyer_code] += leads
+        if applications:
+            self._applications[buyer_code] += applications
+
+    def start(self):
+        """Запустить периодический сброс"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить сброс и записать остаток"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Записать накопленные приращения"""
+        leads, self._leads = self._leads, Counter()
+        applications, self._applications = self._applications, Counter()
+        rows = [
+            {'code': code, 'leads': leads[code], 'applications': applications[code]}
+            for code in leads.keys() | applications.keys()
+        ]
+        if not rows:
+            return
+
+        async def write(session):
+            await session.execute(
+                update(Buyer.__table__)
+                .where(Buyer.__table__.c.buyer_code == bindparam('code'))
+                .values(
+                    total_leads=func.coalesce(Buyer.__table__.c.total_leads, 0) + bindparam('leads'),
+                    total_applications=func.coalesce(Buyer.__table__.c.total_applications, 0) + bindparam('applications')
+                ),
+                rows
+            )
+
+        try:
+            await run_write(write)
+        except Exception:
+            self.failed_flushes += 1
+            self._leads.update(leads)
+            self._applications.update(applications)
+            raise
+        self.flushes += 1
+
+    def stats(self) -> dict:
+        """Метрики агрегатора"""
+        return {
+            'pending_buyers': len(self._leads.keys() | self._applications.keys()),
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи статистики байеров: {e}")
+
+
+buyer_stats = BuyerStatsAggregator()
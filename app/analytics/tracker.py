@@ -5,9 +5,10 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from app.database.models import UserAction, async_session
 from aiogram.types import User as TelegramUser
 
+from app.analytics.writer import action_writer
+
 
 class ActionTracker:
     """Класс для трекинга действий пользователей"""
@@ -41,20 +42,18 @@ class ActionTracker:
         else:
             time_since_start = 0
         
-        # Сохраняем в БД
-        async with async_session() as session:
-            action = UserAction(
-                user_id=user_id,
-                action_type=action_type,
-                action_value=action_value,
-                step_name=step_name,
-                session_id=session_id,
-                time_since_start=time_since_start,
-                previous_action=previous_action,
-                device_info=f"tg_{user.language_code or 'unknown'}"
-            )
-            session.add(action)
-            await session.commit()
+        # Ставим в очередь фоновой записи, хендлер не ждёт БД
+        action_writer.put({
+            'user_id': user_id,
+            'action_type': action_type,
+            'action_value': action_value,
+            'step_name': step_name,
+            'session_id': session_id,
+            'created_at': datetime.utcnow(),
+            'time_since_start': time_since_start,
+            'previous_action': previous_action,
+            'device_info': f"tg_{user.language_code or 'unknown'}"
+        })
     
     @classmethod
     def get_session_id(cls, user_id: int) -> Optional[str]:
@@ -0,0 +1,139 @@
+"""
+Фоновая пакетная запись действий пользователей
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from app.config import ANALYTICS_BATCH_SIZE, ANALYTICS_FLUSH_INTERVAL, ANALYTICS_QUEUE_SIZE
+from app.database.models import UserAction
+from app.database.sqlite_writer import run_write
+
+logger = logging.getLogger(__name__)
+
+
+class ActionWriter:
+    """Буфер действий: очередь + фоновая задача, которая пишет их пачками
+
+    Пачка сбрасывается, когда в очереди набралось `batch_size` записей
+    или прошло `flush_interval` секунд с прошлого сброса.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = ANALYTICS_BATCH_SIZE,
+        flush_interval: float = ANALYTICS_FLUSH_INTERVAL,
+        max_queue_size: int = ANALYTICS_QUEUE_SIZE
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Количество действий, ожидающих записи"""
+        return self._queue.qsize()
+
+    def put(self, row: dict) -> bool:
+        """Поставить действие в очередь без ожидания"""
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+        return True
+
+    def start(self):
+        """Запустить фоновую запись"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую запись и сбросить остаток очереди"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Записать всё, что накопилось в очереди"""
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._write(batch)
+
+    def stats(self) -> dict:
+        """Метрики буфера"""
+        return {
+            'queue_depth': self.queue_depth,
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'last_flush_latency_ms': round(self.last_flush_latency * 1000, 2),
+            'max_flush_latency_ms': round(self.max_flush_latency * 1000, 2)
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи действий: {e}")
+
+    async def _write(self, rows: List[dict]):
+        started = time.perf_counter()
+        try:
+            # executemany по Core-insert: SQLAlchemy склеивает его в многострочный
+            # INSERT ... VALUES (...), (...) с учётом лимита параметров драйвера
+            async def write(session):
+                await session.execute(insert(UserAction.__table__), rows)
+
+            await run_write(write)
+        except Exception:
+            # Пачка возвращается в очередь до следующего сброса; что не
+            # поместилось в её лимит — теряется
+            self.failed_flushes += 1
+            self._requeue(rows)
+            raise
+        latency = time.perf_counter() - started
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.flushes += 1
+        self.written += len(rows)
+
+    def _requeue(self, rows: List[dict]):
+        for index, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                self.dropped += len(rows) - index
+                return
+
+
+action_writer = ActionWriter()
@@ -0,0 +1,24 @@
+"""
+Кеши в памяти процесса для горячих путей хендлеров
+"""
+from .applicants import applicants
+from .buyers import buyers
+from .counters import recent_applications
+from .countries import latest_joiners
+from .reviews import review_pool
+from .refresher import cache_refresher
+
+
+async def warm_up_caches():
+    """Прогреть все кеши из БД при старте"""
+    await applicants.warm_up()
+    await recent_applications.warm_up()
+    await latest_joiners.warm_up()
+    await review_pool.refresh()
+    await buyers.warm_up()
+
+
+__all__ = [
+    'applicants', 'buyers', 'recent_applications', 'latest_joiners', 'review_pool',
+    'cache_refresher', 'warm_up_caches'
+]
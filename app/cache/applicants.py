@@ -0,0 +1,71 @@
+"""
+Множество пользователей, у которых уже есть заявка
+"""
+import time
+from typing import Dict, Optional, Set
+
+from sqlalchemy import select
+
+from app.config import APPLICANTS_NEGATIVE_TTL
+from app.database.models import Application, async_session
+
+
+class ApplicantsCache:
+    """Проверка "подал ли пользователь заявку" без обращения к БД
+
+    Положительный ответ хранится всегда: заявку нельзя отозвать.
+    Отрицательный — `negative_ttl` секунд, чтобы увидеть заявку,
+    созданную другим процессом бота.
+    """
+
+    # Порог, после которого из отрицательного кеша вычищаются устаревшие записи
+    MAX_ABSENT = 100_000
+
+    def __init__(self, negative_ttl: float = APPLICANTS_NEGATIVE_TTL):
+        self.negative_ttl = negative_ttl
+        self._members: Set[int] = set()
+        self._absent: Dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    async def warm_up(self):
+        """Загрузить user_id всех заявок"""
+        async with async_session() as session:
+            result = await session.stream_scalars(
+                select(Application.user_id),
+                execution_options={'yield_per': 10_000}
+            )
+            async for user_id in result:
+                self._members.add(user_id)
+
+    def lookup(self, user_id: int) -> Optional[bool]:
+        """True/False из кеша или None, если нужно спросить БД"""
+        if user_id in self._members:
+            self.hits += 1
+            return True
+        expires_at = self._absent.get(user_id)
+        if expires_at is not None and expires_at > time.monotonic():
+            self.hits += 1
+            return False
+        self.misses += 1
+        return None
+
+    def add(self, user_id: int):
+        """Пользователь подал заявку"""
+        self._members.add(user_id)
+        self._absent.pop(user_id, None)
+
+    def mark_absent(self, user_id: int):
+        """В БД заявки нет — запомнить на negative_ttl секунд"""
+        now = time.monotonic()
+        if len(self._absent) >= self.MAX_ABSENT:
+            self._absent = {uid: exp for uid, exp in self._absent.items() if exp > now}
+            if len(self._absent) >= self.MAX_ABSENT:
+                self._absent.clear()
+        self._absent[user_id] = now + self.negative_ttl
+
+
+applicants = ApplicantsCache()
@@ -0,0 +1,170 @@
+"""
+Байеры с настройками пикселей: кеш с TTL для атрибуции и отправки конверсий
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.config import BUYERS_CACHE_TTL, BUYERS_NEGATIVE_TTL
+from app.database.models import Buyer, BuyerPixelConfig, async_session, session_scope
+
+# Счётчики меняются постоянно и в снимок не входят (см. buyer_stats)
+_BUYER_STATS_COLUMNS = {'total_leads', 'total_applications'}
+
+
+class _Snapshot:
+    """Неизменяемая копия строки, не привязанная к сессии"""
+
+    __slots__ = ()
+
+    def __init__(self, row, **extra):
+        for name in self.__slots__:
+            object.__setattr__(self, name, extra[name] if name in extra else getattr(row, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} доступен только для чтения")
+
+    def __repr__(self):
+        return f"<{type(self).__name__}({self.id})>"
+
+
+class PixelConfigSnapshot(_Snapshot):
+    """Снимок BuyerPixelConfig"""
+
+    __slots__ = tuple(column.key for column in BuyerPixelConfig.__table__.columns)
+
+
+class BuyerSnapshot(_Snapshot):
+    """Снимок Buyer вместе с `pixel_config`"""
+
+    __slots__ = tuple(
+        column.key for column in Buyer.__table__.columns if column.key not in _BUYER_STATS_COLUMNS
+    ) + ('pixel_config',)
+
+
+def snapshot_buyer(buyer: Buyer) -> BuyerSnapshot:
+    """Снимок загруженного байера (pixel_config должен быть загружен)"""
+    config = buyer.pixel_config
+    return BuyerSnapshot(buyer, pixel_config=PixelConfigSnapshot(config) if config is not None else None)
+
+
+class BuyerCache:
+    """Read-through кеш байеров по `buyer_code` и по id
+
+    Найденный байер живёт `ttl` секунд, неизвестный код — `negative_ttl`,
+    чтобы мусорные payload'ы /start не ходили в БД. Одновременные промахи
+    по одному коду ждут один общий запрос. После правки байера нужно
+    вызвать `invalidate(code)`; правки из другого процесса подхватятся по TTL.
+    """
+
+    # Порог, после которого из кеша вычищаются устаревшие записи
+    MAX_ENTRIES = 10_000
+
+    def __init__(self, ttl: float = BUYERS_CACHE_TTL, negative_ttl: float = BUYERS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._by_code: Dict[str, Tuple[Optional[BuyerSnapshot], float]] = {}
+        self._code_by_id: Dict[int, str] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Растёт при invalidate(): результат загрузки, начатой раньше, не кешируется
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def lookup(self, buyer_code: str) -> Tuple[bool, Optional[BuyerSnapshot]]:
+        """(есть ли свежая запись, байер или None) без обращения к БД"""
+        entry = self._by_code.get(buyer_code)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return True, entry[0]
+        self.misses += 1
+        return False, None
+
+    async def get(self, buyer_code: str, session=None) -> Optional[BuyerSnapshot]:
+        """Байер по коду из кеша или из БД"""
+        found, buyer = self.lookup(buyer_code)
+        if found:
+            return buyer
+        future = self._loading.get(buyer_code)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._loading[buyer_code] = asyncio.get_running_loop().create_future()
+        version = self._version
+        try:
+            buyer = await self._load(Buyer.buyer_code == buyer_code, session)
+            if version == self._version:
+                self._store(buyer_code, buyer)
+            future.set_result(buyer)
+            return buyer
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибка передана ждущим; без них она не должна всплывать в логах loop
+            future.exception()
+            raise
+        finally:
+            del self._loading[buyer_code]
+            if not future.done():
+                future.cancel()
+
+    async def get_by_id(self, buyer_id: int, session=None) -> Optional[BuyerSnapshot]:
+        """Байер по id (для отправки конверсий)"""
+        code = self._code_by_id.get(buyer_id)
+        if code is not None:
+            found, buyer = self.lookup(code)
+            if found and buyer is not None:
+                return buyer
+        version = self._version
+        buyer = await self._load(Buyer.id == buyer_id, session)
+        if buyer is not None and version == self._version:
+            self._store(buyer.buyer_code, buyer)
+        return buyer
+
+    def invalidate(self, buyer_code: Optional[str] = None):
+        """Сбросить запись байера (или весь кеш, если код не указан)"""
+        self._version += 1
+        if buyer_code is None:
+            self._by_code.clear()
+            self._code_by_id.clear()
+            return
+        entry = self._by_code.pop(buyer_code, None)
+        if entry is not None and entry[0] is not None:
+            self._code_by_id.pop(entry[0].id, None)
+
+    async def warm_up(self):
+        """Загрузить всех байеров (их единицы-десятки)"""
+        async with async_session() as session:
+            result = await session.scalars(select(Buyer).options(selectinload(Buyer.pixel_config)))
+            for buyer in result:
+                self._store(buyer.buyer_code, snapshot_buyer(buyer))
+
+    async def _load(self, condition, session=None) -> Optional[BuyerSnapshot]:
+        async with session_scope(session) as session:
+            buyer = await session.scalar(
+                select(Buyer).options(selectinload(Buyer.pixel_config)).where(condition)
+            )
+            return snapshot_buyer(buyer) if buyer is not None else None
+
+    def _store(self, buyer_code: str, buyer: Optional[BuyerSnapshot]):
+        now = time.monotonic()
+        if len(self._by_code) >= self.MAX_ENTRIES:
+            self._by_code = {code: entry for code, entry in self._by_code.items() if entry[1] > now}
+            if len(self._by_code) >= self.MAX_ENTRIES:
+                self._by_code.clear()
+            self._code_by_id = {
+                entry[0].id: code for code, entry in self._by_code.items() if entry[0] is not None
+            }
+        if buyer is None:
+            self._by_code[buyer_code] = (None, now + self.negative_ttl)
+            return
+        self._by_code[buyer_code] = (buyer, now + self.ttl)
+        self._code_by_id[buyer.id] = buyer_code
+
+
+buyers = BuyerCache()
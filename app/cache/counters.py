@@ -0,0 +1,118 @@
+"""
+Скользящие счётчики заявок по времени
+"""
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.database.models import Application, async_session
+
+
+class SlidingWindowCounter:
+    """Кольцевой буфер поминутных корзин
+
+    Добавление — O(1), подсчёт за окно — сумма не более `buckets` ячеек,
+    без обращения к БД. Окно выравнивается по границе корзины.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, buckets: int = 24 * 60):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self._counts: List[int] = [0] * buckets
+        # Номер корзины (epoch // bucket_seconds), которой сейчас принадлежит ячейка
+        self._epochs: List[int] = [-1] * buckets
+        self.warmed = False
+
+    @property
+    def span_seconds(self) -> int:
+        """Максимальное окно, которое покрывает буфер"""
+        return self.bucket_seconds * self.buckets
+
+    def add(self, timestamp: Optional[float] = None, amount: int = 1):
+        """Учесть событие (по умолчанию — сейчас)"""
+        now = time.time()
+        timestamp = now if timestamp is None else timestamp
+        epoch = int(timestamp // self.bucket_seconds)
+        if epoch <= int(now // self.bucket_seconds) - self.buckets:
+            return  # старше окна буфера
+        slot = epoch % self.buckets
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def count(self, hours: float = 1) -> int:
+        """Количество событий за последние `hours` часов"""
+        current = int(time.time() // self.bucket_seconds)
+        window = min(math.ceil(hours * 3600 / self.bucket_seconds), self.buckets)
+        total = 0
+        for epoch in range(current - window + 1, current + 1):
+            slot = epoch % self.buckets
+            if self._epochs[slot] == epoch:
+                total += self._counts[slot]
+        return total
+
+    def covers(self, hours: float) -> bool:
+        """Можно ли ответить на окно `hours` из буфера"""
+        return self.warmed and hours * 3600 <= self.span_seconds
+
+
+class RecentApplicationsCounter(SlidingWindowCounter):
+    """Заявки за последние сутки
+
+    Заявки других процессов (WORKERS > 1, реплики) счётчик видит только
+    через БД: `refresh()` по таймеру дочитывает заявки, созданные после
+    прошлого чтения. Окно чтения захватывает `lookback` секунд до него —
+    заявки, закоммиченные позже, чем им проставлен created_at, — а уже
+    учтённые отсеиваются по id.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, buckets: int = 24 * 60, lookback: float = 60):
+        super().__init__(bucket_seconds, buckets)
+        self.lookback = lookback
+        # id заявок, которые попадут в окно следующего чтения, -> время создания
+        self._seen: Dict[int, float] = {}
+        self._synced_at: Optional[datetime] = None
+
+    def record(self, application_id: int, timestamp: Optional[float] = None):
+        """Учесть заявку, если она ещё не учтена"""
+        if application_id in self._seen:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        self._seen[application_id] = timestamp
+        self.add(timestamp)
+
+    async def _load(self, since: datetime):
+        started = datetime.utcnow()
+        async with async_session() as session:
+            result = await session.stream(
+                select(Application.id, Application.created_at).where(Application.created_at >= since),
+                execution_options={'yield_per': 10_000}
+            )
+            async for application_id, created_at in result:
+                # created_at хранится как наивное UTC-время
+                self.record(application_id, created_at.replace(tzinfo=timezone.utc).timestamp())
+        self._synced_at = started
+        horizon = started.replace(tzinfo=timezone.utc).timestamp() - self.lookback
+        self._seen = {key: value for key, value in self._seen.items() if value >= horizon}
+
+    async def warm_up(self):
+        """Засеять буфер заявками за период, который он покрывает"""
+        self._counts = [0] * self.buckets
+        self._epochs = [-1] * self.buckets
+        self._seen = {}
+        await self._load(datetime.utcnow() - timedelta(seconds=self.span_seconds))
+        self.warmed = True
+
+    async def refresh(self):
+        """Дочитать из БД заявки, созданные после прошлого чтения"""
+        if self._synced_at is None:
+            await self.warm_up()
+            return
+        await self._load(self._synced_at - timedelta(seconds=self.lookback))
+
+
+recent_applications = RecentApplicationsCounter()
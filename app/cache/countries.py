@@ -0,0 +1,93 @@
+"""
+Последний записавшийся по каждой стране
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database.models import Application, async_session
+
+
+def normalize_country(country: str) -> str:
+    """Ключ страны: без лишних пробелов и без учёта регистра"""
+    return ' '.join(country.split()).casefold()
+
+
+class LatestJoinerIndex:
+    """Словарь "страна -> имя последнего записавшегося"
+
+    Хранит только тех, кто записался не раньше `max_age` назад.
+    Количество стран ограничено: ввод свободный, вытесняются самые старые.
+
+    Заявки других процессов индекс дочитывает из БД в `refresh()`, с
+    запасом `lookback` секунд до прошлого чтения. Повторно прочитанная
+    запись ничего не меняет: более старая не вытесняет более новую.
+    """
+
+    def __init__(
+        self,
+        max_age: timedelta = timedelta(days=7),
+        max_countries: int = 10_000,
+        lookback: float = 60
+    ):
+        self.max_age = max_age
+        self.max_countries = max_countries
+        self.lookback = lookback
+        self._latest: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._synced_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    async def warm_up(self):
+        """Заполнить индекс заявками за последние `max_age`"""
+        await self._load(datetime.utcnow() - self.max_age)
+
+    async def refresh(self):
+        """Дочитать из БД заявки, созданные после прошлого чтения"""
+        if self._synced_at is None:
+            await self.warm_up()
+            return
+        await self._load(self._synced_at - timedelta(seconds=self.lookback))
+
+    async def _load(self, since: datetime):
+        started = datetime.utcnow()
+        async with async_session() as session:
+            result = await session.stream(
+                select(Application.country, Application.name, Application.created_at)
+                .where(Application.created_at >= since)
+                .order_by(Application.created_at),
+                execution_options={'yield_per': 10_000}
+            )
+            async for country, name, created_at in result:
+                # created_at хранится как наивное UTC-время
+                self.record(country, name, created_at.replace(tzinfo=timezone.utc).timestamp())
+        self._synced_at = started
+
+    def record(self, country: str, name: str, timestamp: Optional[float] = None):
+        """Запомнить записавшегося"""
+        key = normalize_country(country)
+        timestamp = time.time() if timestamp is None else timestamp
+        current = self._latest.get(key)
+        if current is not None and current[1] > timestamp:
+            return
+        self._latest[key] = (name, timestamp)
+        self._latest.move_to_end(key)
+        while len(self._latest) > self.max_countries:
+            self._latest.popitem(last=False)
+
+    def get(self, country: str) -> Optional[str]:
+        """Имя последнего записавшегося из страны или None"""
+        entry = self._latest.get(normalize_country(country))
+        if entry is None:
+            return None
+        name, timestamp = entry
+        if time.time() - timestamp > self.max_age.total_seconds():
+            return None
+        return name
+
+
+latest_joiners = LatestJoinerIndex()
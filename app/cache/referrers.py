@@ -0,0 +1,54 @@
+"""
+Имена рефереров для приветствия по реферальной ссылке
+"""
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.cache.applicants import applicants
+from app.database.models import Application, session_scope
+
+
+class ReferrerNames:
+    """LRU "user_id -> имя из заявки" для тех, кто делится ссылкой
+
+    Пользователь без заявки рефером не считается; это отсекается
+    кешем `applicants` без запроса к БД.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._names: "OrderedDict[int, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def record(self, user_id: int, name: str):
+        """Запомнить имя (после создания заявки)"""
+        self._names[user_id] = name
+        self._names.move_to_end(user_id)
+        while len(self._names) > self.max_size:
+            self._names.popitem(last=False)
+
+    async def get(self, user_id: int, session=None) -> Optional[str]:
+        """Имя реферера или None, если у него нет заявки"""
+        name = self._names.get(user_id)
+        if name is not None:
+            self._names.move_to_end(user_id)
+            return name
+        if applicants.lookup(user_id) is False:
+            return None
+        async with session_scope(session) as session:
+            name = await session.scalar(
+                select(Application.name).where(Application.user_id == user_id)
+            )
+        if name is None:
+            applicants.mark_absent(user_id)
+            return None
+        applicants.add(user_id)
+        self.record(user_id, name)
+        return name
+
+
+referrer_names = ReferrerNames()
@@ -0,0 +1,55 @@
+"""
+Периодическое обновление кешей, которые пополняются и локально, и в БД
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from app.config import CACHE_REFRESH_INTERVAL
+from app.cache.counters import recent_applications
+from app.cache.countries import latest_joiners
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRefresher:
+    """Фоновая задача: раз в `interval` секунд дочитывает заявки из БД
+
+    Свои заявки процесс учитывает сразу, а заявки других воркеров и
+    реплик — отсюда, с задержкой не больше `interval`.
+    """
+
+    def __init__(self, interval: float = CACHE_REFRESH_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запустить обновление"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить обновление"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self):
+        """Дочитать новые заявки во все кеши"""
+        await recent_applications.refresh()
+        await latest_joiners.refresh()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления кешей: {e}")
+
+
+cache_refresher = CacheRefresher()
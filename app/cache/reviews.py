@@ -0,0 +1,81 @@
+"""
+Пул отзывов в памяти с заранее отформатированными блоками
+"""
+import asyncio
+import random
+import time
+from typing import List
+
+from sqlalchemy import select
+
+from app.config import REVIEWS_CACHE_TTL
+from app.database.models import Review, async_session
+
+REVIEWS_HEADER = "<b>💬 Отзывы наших выпускников:</b>\n\n"
+REVIEWS_FOOTER = "<i>Это лишь малая часть отзывов. Присоединяйтесь к успешным выпускникам!</i>"
+
+
+def format_review(name: str, country: str, text: str, profit: str = None) -> str:
+    """HTML-блок одного отзыва"""
+    block = f"<b>{name}</b> ({country})"
+    if profit:
+        block += f" - <i>{profit}</i>"
+    block += f"\n{text}\n\n"
+    return block
+
+
+class ReviewPool:
+    """Активные отзывы, загруженные одним запросом и сэмплируемые в Python
+
+    Пул перечитывается, если сменилась версия (`invalidate()` после
+    `add_review`) или истёк `ttl` — так подхватываются правки из админки.
+    """
+
+    def __init__(self, ttl: float = REVIEWS_CACHE_TTL):
+        self.ttl = ttl
+        self._blocks: List[str] = []
+        self._version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def invalidate(self):
+        """Пометить пул устаревшим"""
+        self._version += 1
+
+    def _is_stale(self) -> bool:
+        return (
+            self._loaded_version != self._version
+            or time.monotonic() - self._loaded_at > self.ttl
+        )
+
+    async def refresh(self):
+        """Перечитать активные отзывы из БД"""
+        version = self._version
+        async with async_session() as session:
+            result = await session.execute(
+                select(Review.name, Review.country, Review.text, Review.profit)
+                .where(Review.is_active == True)
+                .order_by(Review.id)
+            )
+            self._blocks = [format_review(*row) for row in result]
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+
+    async def sample(self, limit: int = 3) -> List[str]:
+        """Случайные отформатированные отзывы"""
+        if self._is_stale():
+            async with self._lock:
+                if self._is_stale():
+                    await self.refresh()
+        return random.sample(self._blocks, min(limit, len(self._blocks)))
+
+    async def render(self, limit: int = 3) -> str:
+        """Готовый текст сообщения с отзывами"""
+        return REVIEWS_HEADER + ''.join(await self.sample(limit)) + REVIEWS_FOOTER
+
+
+review_pool = ReviewPool()
@@ -18,6 +18,116 @@ if not BOT_TOKEN:
 if not ADMIN_ID:
     raise ValueError("❌ Не установлен ADMIN_ID в .env файле!")
 
+# === БАЗА ДАННЫХ ===
+# Пул соединений (для SQLite в памяти не используется)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))  # постоянных соединений
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))  # дополнительных при пиках
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # секунды ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # пересоздавать соединения старше, секунды
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'  # проверять соединение перед выдачей
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))  # соединений, открываемых при старте
+
+# Профиль SQLite в файле: WAL, прагмы и запись через одну задачу
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', '1') == '1'
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))  # мс ожидания блокировки
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # байт
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', str(64 * 1024)))  # КиБ кеша страниц на соединение
+SQLITE_WRITE_BATCH = int(os.getenv('SQLITE_WRITE_BATCH', '100'))  # записей в одной транзакции писателя
+
+# === ЗАПУСК ===
+BOT_MODE = os.getenv('BOT_MODE', 'polling')  # polling или webhook
+# Публичный адрес без пути, например https://bot.example.com.
+# Пусто — вебхук в Telegram не регистрируется (локальная отладка)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # X-Telegram-Bot-Api-Secret-Token: A-Z, a-z, 0-9, _ и -
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv('WEBHOOK_MAX_CONCURRENCY', '100'))  # апдейтов в обработке одновременно
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))  # соединений от Telegram (1-100)
+# Процессов-обработчиков: больше 1 — апдейты раздаются воркерам по user_id
+WORKERS = int(os.getenv('WORKERS', '1'))
+# Свой Bot API сервер (или заглушка для нагрузочных тестов); пусто — api.telegram.org
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
+
+if BOT_MODE not in ('polling', 'webhook'):
+    raise ValueError(f"❌ BOT_MODE должен быть polling или webhook, а не {BOT_MODE!r}")
+if BOT_MODE == 'webhook' and WEBHOOK_URL and not WEBHOOK_SECRET:
+    raise ValueError("❌ Для вебхука нужен WEBHOOK_SECRET в .env файле!")
+
+# === АНАЛИТИКА ===
+# Действия пользователей пишутся в БД пачками в фоне
+ANALYTICS_BATCH_SIZE = int(os.getenv('ANALYTICS_BATCH_SIZE', '500'))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', '2'))  # секунды
+ANALYTICS_QUEUE_SIZE = int(os.getenv('ANALYTICS_QUEUE_SIZE', '50000'))
+# Счётчики лидов/заявок байеров копятся в памяти и сбрасываются одним UPDATE на байера
+BUYER_STATS_FLUSH_INTERVAL = float(os.getenv('BUYER_STATS_FLUSH_INTERVAL', '5'))  # секунды
+
+# === КОНВЕРСИИ ===
+# Отправка конверсий в рекламные сети идёт в фоне, вне хендлеров
+POSTBACK_CONCURRENCY = int(os.getenv('POSTBACK_CONCURRENCY', '20'))  # одновременных HTTP-запросов
+POSTBACK_TIMEOUT = float(os.getenv('POSTBACK_TIMEOUT', '10'))  # секунды на запрос
+POSTBACK_RETRY_BASE_DELAY = float(os.getenv('POSTBACK_RETRY_BASE_DELAY', '2'))  # секунды, удваивается
+# Пакетная отправка для сетей, принимающих несколько событий (Facebook CAPI)
+POSTBACK_BATCH_SIZE = int(os.getenv('POSTBACK_BATCH_SIZE', '200'))
+POSTBACK_BATCH_MAX_AGE = float(os.getenv('POSTBACK_BATCH_MAX_AGE', '2'))  # секунды
+# Предохранитель на каждую сеть: при ошибках или медленных ответах сеть временно отключается
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', '100'))  # последних запросов в расчёте
+BREAKER_MIN_REQUESTS = int(os.getenv('BREAKER_MIN_REQUESTS', '20'))
+BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', '0.5'))  # доля ошибок для размыкания
+BREAKER_SLOW_P95 = float(os.getenv('BREAKER_SLOW_P95', '5'))  # секунды
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '30'))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv('BREAKER_HALF_OPEN_CALLS', '3'))  # пробных запросов
+
+# === OUTBOX ===
+# Побочные эффекты заявки (конверсии) пишутся в таблицу outbox в одной транзакции с заявкой
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', '2'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '1'))  # секунды
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '120'))  # сколько событие закреплено за воркером
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+
+# === НАПОМИНАНИЯ ===
+# Общий лимит исходящих сообщений бота (у Telegram ~30 сообщений в секунду)
+TELEGRAM_RATE_LIMIT = float(os.getenv('TELEGRAM_RATE_LIMIT', '30'))
+# Последовательность напоминаний: сдвиги от начала заполнения, суффиксы m/h/d
+_REMINDER_UNITS = {'m': 1, 'h': 60, 'd': 1440}
+REMINDER_SEQUENCE = [
+    int(part.strip()[:-1]) * _REMINDER_UNITS[part.strip()[-1]]
+    for part in os.getenv('REMINDER_SEQUENCE', '30m,6h,24h').split(',')
+]  # минуты
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '500'))  # напоминаний за один проход
+REMINDER_RETRY_DELAY = int(os.getenv('REMINDER_RETRY_DELAY', '300'))  # секунды до повтора после ошибки сети
+
+# === РАССЫЛКИ ===
+BROADCAST_PAGE_SIZE = int(os.getenv('BROADCAST_PAGE_SIZE', '200'))  # получателей на страницу (и на чекпоинт)
+BROADCAST_CHAT_INTERVAL = float(os.getenv('BROADCAST_CHAT_INTERVAL', '1'))  # секунды между сообщениями в один чат
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv('BROADCAST_PROGRESS_INTERVAL', '10'))  # как часто обновлять статус админу
+
+# === КЕШИ ===
+# Сколько секунд помнить, что у пользователя нет заявки (перед повторной проверкой в БД)
+APPLICANTS_NEGATIVE_TTL = float(os.getenv('APPLICANTS_NEGATIVE_TTL', '30'))
+# Как часто перечитывать отзывы из БД, секунды
+REVIEWS_CACHE_TTL = float(os.getenv('REVIEWS_CACHE_TTL', '300'))
+# Сколько секунд хранить байеров с настройками пикселей (правки из админки видны не позже)
+BUYERS_CACHE_TTL = float(os.getenv('BUYERS_CACHE_TTL', '60'))
+BUYERS_NEGATIVE_TTL = float(os.getenv('BUYERS_NEGATIVE_TTL', '60'))  # для неизвестных кодов
+# Как часто дочитывать из БД заявки других процессов в счётчики и индекс стран, секунды
+CACHE_REFRESH_INTERVAL = float(os.getenv('CACHE_REFRESH_INTERVAL', '30'))
+
+# === ЛИДЕР ===
+# Напоминания, outbox и рассылки выполняет один экземпляр — держатель аренды в job_leases
+LEADER_LEASE_SECONDS = float(os.getenv('LEADER_LEASE_SECONDS', '30'))  # через сколько чужая аренда считается брошенной
+LEADER_HEARTBEAT_SECONDS = float(os.getenv('LEADER_HEARTBEAT_SECONDS', '10'))  # как часто продлевать аренду
+
+# === FSM ===
+FSM_CACHE_SIZE = int(os.getenv('FSM_CACHE_SIZE', '50000'))  # состояний в памяти процесса
+FSM_FLUSH_INTERVAL = float(os.getenv('FSM_FLUSH_INTERVAL', '1'))  # секунды между записями изменений в БД
+# Через сколько секунд перечитывать состояние из БД (0 — не перечитывать).
+# Нужно, если апдейты одного пользователя могут попасть в разные процессы
+FSM_CACHE_TTL = float(os.getenv('FSM_CACHE_TTL', '0'))
+
 # === СПИСКИ ДЛЯ ВЫБОРА ===
 CONTACT_TIMES = [
     "🌅 Утро (8:00 - 12:00)",
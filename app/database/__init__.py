@@ -3,6 +3,7 @@
 """
 from .models import init_db, Application, UnfinishedApplication, Review, Referral
 from .queries import (
+    ApplicationAlreadyExists,
     create_application,
     get_application_by_user_id,
     user_has_application,
@@ -10,11 +11,11 @@ from .queries import (
     get_all_applications,
     get_unprocessed_applications,
     save_unfinished_application,
+    register_user,
     get_unfinished_applications_for_reminder,
     mark_reminder_sent,
     get_recent_applications_count,
     get_recent_applications,
-    get_random_reviews,
     add_review,
     save_referral,
     get_user_referrals_count,
@@ -26,6 +27,7 @@ __all__ = [
     'Application',
     'UnfinishedApplication',
     'Review',
+    'ApplicationAlreadyExists',
     'create_application',
     'get_application_by_user_id',
     'user_has_application',
@@ -33,11 +35,11 @@ __all__ = [
     'get_all_applications',
     'get_unprocessed_applications',
     'save_unfinished_application',
+    'register_user',
     'get_unfinished_applications_for_reminder',
     'mark_reminder_sent',
     'get_recent_applications_count',
     'get_recent_applications',
-    'get_random_reviews',
     'add_review',
     'save_referral',
     'get_user_referrals_count',
@@ -0,0 +1,257 @@
+"""
+Хранилище FSM aiogram в базе данных
+
+Состояния переживают перезапуск бота. Чтение и запись идут через LRU-кеш
+в памяти процесса, а изменения копятся и раз в `flush_interval` секунд
+уходят в таблицу `fsm_storage` одной транзакцией: несколько правок одного
+ключа за интервал дают одну запись. Обработчик в БД ходит только при
+промахе кеша.
+
+Кеш считается источником правды для пользователя, чьи апдейты приходят
+в этот процесс. Если апдейты одного пользователя могут попасть в разные
+процессы, задайте FSM_CACHE_TTL, чтобы чистые записи перечитывались из БД.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import FSM_CACHE_SIZE, FSM_FLUSH_INTERVAL, FSM_CACHE_TTL
+from app.database.models import FsmRecord, async_session
+from app.database.sqlite_writer import run_write
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """Состояние и данные одного ключа; `data_json` — то, что уйдёт в БД"""
+
+    __slots__ = ('state', 'data', 'data_json', 'loaded_at')
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], data_json: Optional[str] = None):
+        self.state = state
+        self.data = data
+        self.data_json = data_json if data_json is not None else _dumps(data)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+def storage_key(key: StorageKey) -> str:
+    """Строковый ключ записи в `fsm_storage`"""
+    return ':'.join((
+        str(key.bot_id),
+        str(key.chat_id),
+        str(key.user_id),
+        str(key.thread_id or ''),
+        key.business_connection_id or '',
+        key.destiny
+    ))
+
+
+class SqlStorage(BaseStorage):
+    """FSM-хранилище поверх SQLAlchemy с кешем и отложенной записью
+
+    При падении процесса теряются изменения не больше чем за один интервал.
+    Данные FSM должны сериализоваться в JSON: ошибка возникает сразу
+    в `set_data`, а не при фоновой записи.
+    """
+
+    def __init__(
+        self,
+        max_size: int = FSM_CACHE_SIZE,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        ttl: float = FSM_CACHE_TTL
+    ):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._records: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # Ключи, которые сейчас записываются: их нельзя вытеснять и перечитывать
+        self._flushing: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def start(self):
+        """Запустить периодическую запись изменений"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Остановить запись и сохранить остаток"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        key = storage_key(key)
+        record = await self._get(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._dirty.add(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(storage_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        data_json = _dumps(data)
+        key = storage_key(key)
+        record = await self._get(key)
+        record.data = data.copy()
+        record.data_json = data_json
+        self._dirty.add(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get(storage_key(key))).data.copy()
+
+    async def flush(self):
+        """Записать изменённые ключи одной транзакцией"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        self._flushing = dirty
+        upserts, deletes = [], []
+        for key in dirty:
+            record = self._records.get(key)
+            if record is None:
+                continue
+            if record.empty:
+                deletes.append({'k': key})
+            else:
+                upserts.append({'key': key, 'state': record.state, 'data': record.data_json})
+
+        async def write(session):
+            if upserts:
+                stmt = _insert(session.bind).values(
+                    key=bindparam('key'),
+                    state=bindparam('state'),
+                    data=bindparam('data'),
+                    updated_at=bindparam('updated_at')
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FsmRecord.key],
+                    set_={
+                        'state': stmt.excluded.state,
+                        'data': stmt.excluded.data,
+                        'updated_at': stmt.excluded.updated_at
+                    }
+                )
+                now = datetime.utcnow()
+                await session.execute(stmt, [{**row, 'updated_at': now} for row in upserts])
+            if deletes:
+                await session.execute(
+                    delete(FsmRecord.__table__).where(FsmRecord.__table__.c.key == bindparam('k')),
+                    deletes
+                )
+
+        try:
+            await run_write(write)
+        except Exception:
+            self.failed_flushes += 1
+            # Записи остались в кеше: запишем их при следующем сбросе
+            self._dirty |= dirty
+            raise
+        finally:
+            self._flushing = set()
+        self.flushes += 1
+        self._trim()
+
+    def stats(self) -> dict:
+        """Метрики хранилища"""
+        return {
+            'cached': len(self._records),
+            'dirty': len(self._dirty),
+            'hits': self.hits,
+            'misses': self.misses,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes
+        }
+
+    async def _get(self, key: str) -> _Record:
+        record = self._records.get(key)
+        if record is not None and (
+            not self.ttl or self._pinned(key) or time.monotonic() - record.loaded_at < self.ttl
+        ):
+            self.hits += 1
+            self._records.move_to_end(key)
+            return record
+
+        self.misses += 1
+        async with async_session() as session:
+            row = (await session.execute(
+                select(FsmRecord.state, FsmRecord.data).where(FsmRecord.key == key)
+            )).first()
+        current = self._records.get(key)
+        if current is not None and (current is not record or self._pinned(key)):
+            # Пока шёл запрос, ключ успели загрузить или изменить
+            return current
+        if row is None:
+            record = _Record(None, {})
+        else:
+            record = _Record(row.state, json.loads(row.data) if row.data else {}, row.data)
+        self._records[key] = record
+        self._records.move_to_end(key)
+        self._trim()
+        return record
+
+    def _pinned(self, key: str) -> bool:
+        return key in self._dirty or key in self._flushing
+
+    def _trim(self):
+        """Вытеснить самые старые чистые записи сверх `max_size`
+
+        Изменённые, но не записанные ключи остаются в памяти до сброса,
+        последний использованный — тоже.
+        """
+        excess = len(self._records) - self.max_size
+        if excess <= 0:
+            return
+        for key in list(self._records)[:-1]:
+            if not self._pinned(key):
+                del self._records[key]
+                excess -= 1
+                if excess == 0:
+                    break
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи состояний FSM: {e}")
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _insert(conn):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей базы"""
+    if conn.dialect.name == 'postgresql':
+        return pg_insert(FsmRecord.__table__)
+    return sqlite_insert(FsmRecord.__table__)
+
+
+fsm_storage = SqlStorage()
@@ -2,13 +2,17 @@ from sqlalchemy import Float
 """
 Модели базы данных
 """
+from contextlib import asynccontextmanager
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, BigInteger, Text, ForeignKey
+from typing import AsyncIterator, Optional
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, BigInteger, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.config import DATABASE_URL
+from app.database.pool import engine_options, attach_pool_metrics
+from app.database.sqlite import uses_sqlite_profile, apply_sqlite_profile
 
 Base = declarative_base()
 
@@ -27,6 +31,13 @@ class Application(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_processed = Column(Boolean, default=False)  # Обработана ли заявка
     referred_by = Column(BigInteger, nullable=True)  # Кто пригласил
+    buyer_id = Column(Integer, ForeignKey('buyers.id'), nullable=True)  # Байер, с чьей ссылки пришёл
+    click_id = Column(String(255), nullable=True)  # Click id рекламной сети
+    
+    __table_args__ = (
+        # Счётчик и лента последних заявок
+        Index('ix_applications_created_at', 'created_at'),
+    )
     
     def __repr__(self):
         return f"<Application({self.name}, {self.phone})>"
@@ -42,7 +53,14 @@ class UnfinishedApplication(Base):
     current_step = Column(String(50), nullable=False)  # Текущий шаг
     data = Column(Text, nullable=True)  # JSON с введенными данными
     created_at = Column(DateTime, default=datetime.utcnow)
-    reminder_sent = Column(Boolean, default=False)  # Отправлено ли напоминание
+    reminder_sent = Column(Boolean, default=False)  # Вся последовательность напоминаний отправлена
+    reminder_step = Column(Integer, default=0)  # Номер следующего напоминания в REMINDER_SEQUENCE
+    next_reminder_at = Column(DateTime, nullable=True)  # Когда отправить; NULL — напоминаний больше нет
+    
+    __table_args__ = (
+        # Выборка напоминаний к отправке — диапазон по этому индексу
+        Index('ix_unfinished_applications_next_reminder_at', 'next_reminder_at'),
+    )
     
     def __repr__(self):
         return f"<UnfinishedApplication({self.user_id}, {self.current_step})>"
@@ -74,12 +92,19 @@ class Referral(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     bonus_paid = Column(Boolean, default=False)  # Выплачен ли бонус
     
+    __table_args__ = (
+        Index('ix_referrals_referrer_id', 'referrer_id'),
+    )
+    
     def __repr__(self):
         return f"<Referral({self.referrer_id} -> {self.referred_id})>"
 
 
-# Создаём движок базы данных
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Создаём движок базы данных; пул настраивается из конфига (см. app.database.pool)
+engine = create_async_engine(DATABASE_URL, echo=False, **engine_options(DATABASE_URL))
+attach_pool_metrics(engine)
+if uses_sqlite_profile(DATABASE_URL):
+    apply_sqlite_profile(engine)
 
 # Создаём фабрику сессий
 async_session = sessionmaker(
@@ -99,6 +124,16 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+@asynccontextmanager
+async def session_scope(session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """Использовать переданную сессию апдейта или открыть новую"""
+    if session is not None:
+        yield session
+        return
+    async with async_session() as new_session:
+        yield new_session
+
+
 class Buyer(Base):
     """Модель байера (рекламщика)"""
     __tablename__ = 'buyers'
@@ -135,7 +170,8 @@ class PostbackLog(Base):
     id = Column(Integer, primary_key=True)
     buyer_id = Column(Integer, ForeignKey('buyers.id'))
     application_id = Column(Integer, ForeignKey('applications.id'))
-    status = Column(String(20))  # success, failed, retry
+    network = Column(String(30), nullable=True)  # facebook, google, propeller...
+    status = Column(String(20))  # success, failed, retry, rejected (предохранитель)
     response_code = Column(Integer, nullable=True)
     response_text = Column(Text, nullable=True)
     attempt = Column(Integer, default=1)
@@ -180,6 +216,12 @@ class UserAction(Base):
     time_since_start = Column(Integer, nullable=True)  # секунды от начала сессии
     previous_action = Column(String(50), nullable=True)
     device_info = Column(String(200), nullable=True)
+    
+    __table_args__ = (
+        Index('ix_user_actions_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_user_actions_session_id', 'session_id'),
+        Index('ix_user_actions_created_at', 'created_at'),
+    )
 
 
 class FunnelSnapshot(Base):
@@ -281,5 +323,80 @@ class User(Base):
     last_active = Column(DateTime, default=datetime.utcnow)
     is_blocked = Column(Boolean, default=False)
     
+    # Атрибуция по последней ссылке /start
+    referred_by = Column(BigInteger, nullable=True)
+    buyer_id = Column(Integer, ForeignKey('buyers.id'), nullable=True)
+    click_id = Column(String(255), nullable=True)
+    
     def __repr__(self):
         return f"<User({self.user_id}, {self.username})>"
+
+
+class OutboxEvent(Base):
+    """Событие transactional outbox: побочный эффект, записанный вместе с данными"""
+    __tablename__ = 'outbox'
+    
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)  # conversion
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), nullable=False, default='pending')  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # не раньше этого времени
+    locked_by = Column(String(100), nullable=True)  # воркер, взявший событие
+    locked_until = Column(DateTime, nullable=True)  # аренда истекает — событие снова доступно
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_outbox_status_available_at', 'status', 'available_at'),
+    )
+    
+    def __repr__(self):
+        return f"<OutboxEvent({self.id}, {self.event_type}, {self.status})>"
+
+
+class Broadcast(Base):
+    """Рассылка по всем пользователям с сохранением прогресса"""
+    __tablename__ = 'broadcasts'
+    
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)  # HTML
+    status = Column(String(20), nullable=False, default='running')  # running, done, cancelled
+    created_by = Column(BigInteger, nullable=True)  # Telegram ID админа
+    last_user_id = Column(BigInteger, nullable=False, default=0)  # Курсор: все user_id <= обработаны
+    total = Column(Integer, nullable=True)  # Получателей на момент запуска
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<Broadcast({self.id}, {self.status})>"
+
+
+class FsmRecord(Base):
+    """Состояние и данные FSM aiogram (см. app.database.fsm_storage)"""
+    __tablename__ = 'fsm_storage'
+    
+    key = Column(String(255), primary_key=True)  # bot:chat:user:thread:business:destiny
+    state = Column(String(255), nullable=True)
+    data = Column(Text, nullable=True)  # JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<FsmRecord({self.key}, {self.state})>"
+
+
+class JobLease(Base):
+    """Аренда фоновой задачи: выполняет её только держатель (см. app.services.leader)"""
+    __tablename__ = 'job_leases'
+    
+    name = Column(String(100), primary_key=True)  # leader, broadcast:<id>
+    holder = Column(String(255), nullable=False)  # hostname:pid
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<JobLease({self.name}, {self.holder})>"
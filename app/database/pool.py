@@ -0,0 +1,150 @@
+"""
+Пул соединений с БД: настройки из конфига, прогрев и метрики
+
+Счётчики соединений берутся из событий пула SQLAlchemy (connect,
+checkout, checkin, invalidate). Время ожидания свободного соединения
+событиями не покрывается, поэтому его замеряет `InstrumentedPool`
+вокруг `_do_get` — там же видны таймауты выдачи.
+"""
+import bisect
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_MIN
+)
+
+# Верхние границы корзин гистограммы ожидания, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """Метрики пула одного движка"""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.opened = 0
+        self.invalidated = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_max_ms = 0.0
+        # Последняя корзина — дольше WAIT_BUCKETS_MS[-1]
+        self._wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe_wait(self, seconds: float):
+        ms = seconds * 1000
+        self._wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, ms)] += 1
+        self.wait_max_ms = max(self.wait_max_ms, ms)
+
+    def wait_percentile(self, q: float) -> Optional[float]:
+        """Верхняя граница корзины, в которую попал q-квантиль ожидания, мс"""
+        total = sum(self._wait_counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(WAIT_BUCKETS_MS + (self.wait_max_ms,), self._wait_counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.wait_max_ms
+
+    def snapshot(self) -> dict:
+        """Метрики для логов и /health"""
+        histogram = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self._wait_counts)}
+        histogram['inf'] = self._wait_counts[-1]
+        return {
+            'checked_out': self.checked_out,
+            'opened': self.opened,
+            'invalidated': self.invalidated,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_p95_ms': self.wait_percentile(0.95),
+            'wait_max_ms': round(self.wait_max_ms, 1),
+            'wait_ms': histogram
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, замеряющий ожидание свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - started)
+
+
+def engine_options(database_url: str) -> dict:
+    """Параметры create_async_engine для пула
+
+    SQLite в памяти живёт в одном соединении (StaticPool по умолчанию).
+    Для файла SQLite aiosqlite по умолчанию открывает соединение на
+    каждый запрос (NullPool); здесь он тоже получает пул.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'poolclass': InstrumentedPool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
+
+
+def attach_pool_metrics(engine: AsyncEngine, metrics: PoolMetrics = pool_metrics):
+    """Подписать метрики на события пула"""
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        metrics.opened += 1
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+        metrics.checked_out += 1
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checked_out -= 1
+
+    @event.listens_for(pool, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidated += 1
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int = DB_POOL_MIN):
+    """Открыть `connections` соединений при старте, чтобы первые апдейты их не ждали"""
+    if not isinstance(engine.sync_engine.pool, QueuePool):
+        return
+    opened = []
+    try:
+        # Соединения держатся до конца, иначе пул будет выдавать одно и то же
+        for _ in range(min(connections, DB_POOL_SIZE)):
+            conn = await engine.connect()
+            opened.append(conn)
+            await conn.execute(text('SELECT 1'))
+    finally:
+        for conn in opened:
+            await conn.close()
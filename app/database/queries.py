@@ -2,13 +2,38 @@
 Запросы к базе данных
 """
 import json
-from sqlalchemy import select, func, and_
+from collections import defaultdict
+from sqlalchemy import select, insert, update, delete, exists, func, and_, or_, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database.models import Application, UnfinishedApplication, Review, async_session, Referral, Buyer, PostbackLog
+from app.database.models import Application, UnfinishedApplication, Review, session_scope, Referral, Buyer, PostbackLog, User, OutboxEvent, JobLease
+from app.database.sqlite_writer import run_write
+from app.cache.applicants import applicants
+from app.cache.buyers import buyers, BuyerSnapshot
+from app.cache.counters import recent_applications
+from app.cache.countries import latest_joiners
+from app.cache.reviews import review_pool
+from app.cache.referrers import referrer_names
+from app.analytics.buyer_stats import buyer_stats
+from app.utils.scheduler import reminder_scheduler
+from app.config import REMINDER_SEQUENCE
 from datetime import datetime, timedelta
 from typing import Optional, List
 
 
+def _upsert(session: AsyncSession, model):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей базы"""
+    if session.bind.dialect.name == 'postgresql':
+        return pg_insert(model)
+    return sqlite_insert(model)
+
+
+class ApplicationAlreadyExists(Exception):
+    """У пользователя уже есть заявка (сработал unique по applications.user_id)"""
+
+
 async def create_application(
     user_id: int,
     username: Optional[str],
@@ -16,123 +41,303 @@ async def create_application(
     country: str,
     phone: str,
     contact_time: str,
-    referred_by: Optional[int] = None
+    referred_by: Optional[int] = None,
+    buyer_id: Optional[int] = None,
+    click_id: Optional[str] = None,
+    session: Optional[AsyncSession] = None
 ) -> Application:
-    """Создать новую заявку"""
-    async with async_session() as session:
-        application = Application(
-            user_id=user_id,
-            username=username,
-            name=name,
-            country=country,
-            phone=phone,
-            contact_time=contact_time,
-            created_at=datetime.utcnow(),
-            referred_by=referred_by
+    """Создать новую заявку одной транзакцией
+
+    Незавершенная заявка удаляется без загрузки, заявка вставляется
+    с RETURNING, реферальная связь и событие конверсии для outbox
+    пишутся в той же транзакции (на SQLite — через писателя).
+    """
+    async def write(session: AsyncSession) -> Application:
+        await session.execute(
+            delete(UnfinishedApplication).where(UnfinishedApplication.user_id == user_id)
         )
-        session.add(application)
-        
-        # Удаляем незавершенную заявку, если была
-        unfinished = await session.execute(
-            select(UnfinishedApplication).where(UnfinishedApplication.user_id == user_id)
+        result = await session.scalars(
+            insert(Application).values(
+                user_id=user_id,
+                username=username,
+                name=name,
+                country=country,
+                phone=phone,
+                contact_time=contact_time,
+                created_at=datetime.utcnow(),
+                referred_by=referred_by,
+                buyer_id=buyer_id,
+                click_id=click_id
+            ).returning(Application)
         )
-        unfinished_app = unfinished.scalar_one_or_none()
-        if unfinished_app:
-            await session.delete(unfinished_app)
-        
-        await session.commit()
-        await session.refresh(application)
+        application = result.one()
         
         # Если есть реферер, сохраняем связь
         if referred_by:
-            referral = Referral(
-                referrer_id=referred_by,
-                referred_id=user_id
+            await session.execute(
+                insert(Referral).values(referrer_id=referred_by, referred_id=user_id)
+            )
+        
+        # Конверсию отправит воркер outbox после коммита
+        if buyer_id:
+            await session.execute(
+                insert(OutboxEvent).values(
+                    event_type='conversion',
+                    payload=json.dumps({
+                        'application_id': application.id,
+                        'buyer_id': buyer_id,
+                        'click_id': click_id
+                    })
+                )
             )
-            session.add(referral)
-            await session.commit()
         return application
-
-
-async def get_application_by_user_id(user_id: int) -> Optional[Application]:
+    
+    try:
+        application = await run_write(write, session)
+    except IntegrityError:
+        # Заявка уже есть, только если сработал unique по user_id; прочие
+        # нарушения (например, FK на удалённого байера) пробрасываем как есть
+        async with session_scope(session) as session:
+            exists_already = await session.scalar(
+                select(exists().where(Application.user_id == user_id))
+            )
+        if not exists_already:
+            raise
+        applicants.add(user_id)
+        raise ApplicationAlreadyExists(user_id)
+    applicants.add(user_id)
+    reminder_scheduler.cancel(user_id)
+    recent_applications.record(application.id)
+    latest_joiners.record(country, name)
+    referrer_names.record(user_id, name)
+    return application
+
+
+async def get_application_by_user_id(user_id: int, session: Optional[AsyncSession] = None) -> Optional[Application]:
     """Получить заявку по user_id"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         result = await session.execute(
             select(Application).where(Application.user_id == user_id)
         )
         return result.scalar_one_or_none()
 
 
-async def user_has_application(user_id: int) -> bool:
-    """Проверить, есть ли у пользователя заявка"""
-    application = await get_application_by_user_id(user_id)
-    return application is not None
+async def user_has_application(user_id: int, session: Optional[AsyncSession] = None) -> bool:
+    """Проверить, есть ли у пользователя заявка
+
+    Отвечает из кеша в памяти, в БД идёт только EXISTS на промахе.
+    """
+    cached = applicants.lookup(user_id)
+    if cached is not None:
+        return cached
+    async with session_scope(session) as session:
+        has_application = await session.scalar(
+            select(exists().where(Application.user_id == user_id))
+        )
+    if has_application:
+        applicants.add(user_id)
+    else:
+        applicants.mark_absent(user_id)
+    return bool(has_application)
 
 
 async def save_unfinished_application(
     user_id: int,
     username: Optional[str],
     current_step: str,
-    data: dict
+    data: dict,
+    session: Optional[AsyncSession] = None
 ) -> UnfinishedApplication:
-    """Сохранить незавершенную заявку"""
-    async with async_session() as session:
-        # Проверяем, есть ли уже незавершенная заявка
-        result = await session.execute(
-            select(UnfinishedApplication).where(UnfinishedApplication.user_id == user_id)
+    """Сохранить незавершенную заявку (один INSERT ... ON CONFLICT DO UPDATE)"""
+    async def write(session: AsyncSession) -> UnfinishedApplication:
+        stmt = _upsert(session, UnfinishedApplication).values(
+            user_id=user_id,
+            username=username,
+            current_step=current_step,
+            data=json.dumps(data, ensure_ascii=False),
+            reminder_step=0,
+            next_reminder_at=datetime.utcnow() + timedelta(minutes=REMINDER_SEQUENCE[0])
         )
-        unfinished = result.scalar_one_or_none()
-        
-        if unfinished:
-            # Обновляем существующую
-            unfinished.current_step = current_step
-            unfinished.data = json.dumps(data, ensure_ascii=False)
-        else:
-            # Создаем новую
-            unfinished = UnfinishedApplication(
-                user_id=user_id,
-                username=username,
-                current_step=current_step,
-                data=json.dumps(data, ensure_ascii=False)
-            )
-            session.add(unfinished)
-        
-        await session.commit()
-        return unfinished
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UnfinishedApplication.user_id],
+            set_={
+                'current_step': stmt.excluded.current_step,
+                'data': stmt.excluded.data,
+                # Идущая последовательность не сдвигается; остановленная (отмена)
+                # возобновляется, если пользователь снова начал заполнять
+                'next_reminder_at': case(
+                    (UnfinishedApplication.reminder_sent == True, None),
+                    else_=func.coalesce(UnfinishedApplication.next_reminder_at, stmt.excluded.next_reminder_at)
+                ),
+                # Возобновлённая последовательность начинается с первого напоминания
+                'reminder_step': case(
+                    (UnfinishedApplication.reminder_sent == True, UnfinishedApplication.reminder_step),
+                    (UnfinishedApplication.next_reminder_at.is_(None), stmt.excluded.reminder_step),
+                    else_=UnfinishedApplication.reminder_step
+                )
+            }
+        )
+        result = await session.scalars(
+            stmt.returning(UnfinishedApplication),
+            execution_options={'populate_existing': True}
+        )
+        return result.one()
+    
+    unfinished = await run_write(write, session)
+    if unfinished.next_reminder_at is not None:
+        reminder_scheduler.schedule(user_id, unfinished.next_reminder_at)
+    return unfinished
 
 
-async def get_unfinished_applications_for_reminder() -> List[UnfinishedApplication]:
-    """Получить незавершенные заявки для напоминания"""
-    async with async_session() as session:
-        # Заявки старше 30 минут, которым не отправлено напоминание
-        thirty_minutes_ago = datetime.utcnow() - timedelta(minutes=30)
-        
-        result = await session.execute(
-            select(UnfinishedApplication).where(
-                and_(
-                    UnfinishedApplication.created_at <= thirty_minutes_ago,
-                    UnfinishedApplication.reminder_sent == False
+async def register_user(
+    user_id: int,
+    username: Optional[str],
+    first_name: Optional[str],
+    last_name: Optional[str],
+    referred_by: Optional[int] = None,
+    buyer_id: Optional[int] = None,
+    click_id: Optional[str] = None,
+    session: Optional[AsyncSession] = None
+) -> User:
+    """Создать пользователя или обновить его данные и last_active одним запросом
+
+    Переданная атрибуция перезаписывает сохранённую, не переданная (None) остаётся.
+    """
+    async def write(session: AsyncSession) -> User:
+        stmt = _upsert(session, User).values(
+            user_id=user_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            referred_by=referred_by,
+            buyer_id=buyer_id,
+            click_id=click_id
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={
+                'username': stmt.excluded.username,
+                'first_name': stmt.excluded.first_name,
+                'last_name': stmt.excluded.last_name,
+                'last_active': datetime.utcnow(),
+                'referred_by': func.coalesce(stmt.excluded.referred_by, User.referred_by),
+                'buyer_id': func.coalesce(stmt.excluded.buyer_id, User.buyer_id),
+                # click id относится к своей ссылке байера и меняется вместе с ним
+                'click_id': case(
+                    (stmt.excluded.buyer_id.is_not(None), stmt.excluded.click_id),
+                    else_=User.click_id
                 )
-            )
+            }
+        )
+        result = await session.scalars(
+            stmt.returning(User),
+            execution_options={'populate_existing': True}
+        )
+        return result.one()
+    
+    return await run_write(write, session)
+
+
+async def get_unfinished_applications_for_reminder(limit: Optional[int] = None, session: Optional[AsyncSession] = None) -> List[UnfinishedApplication]:
+    """Незавершенные заявки, которым пора отправить очередное напоминание
+
+    Диапазон по индексу next_reminder_at, самые просроченные первыми.
+    """
+    async with session_scope(session) as session:
+        query = (
+            select(UnfinishedApplication)
+            .where(UnfinishedApplication.next_reminder_at <= datetime.utcnow())
+            .order_by(UnfinishedApplication.next_reminder_at)
         )
+        if limit:
+            query = query.limit(limit)
+        result = await session.execute(query)
         return result.scalars().all()
 
 
-async def mark_reminder_sent(user_id: int):
-    """Отметить, что напоминание отправлено"""
-    async with async_session() as session:
+async def get_pending_reminders(session: Optional[AsyncSession] = None) -> List[tuple]:
+    """(user_id, next_reminder_at) всех запланированных напоминаний"""
+    async with session_scope(session) as session:
         result = await session.execute(
-            select(UnfinishedApplication).where(UnfinishedApplication.user_id == user_id)
+            select(UnfinishedApplication.user_id, UnfinishedApplication.next_reminder_at).where(
+                UnfinishedApplication.next_reminder_at.is_not(None)
+            )
         )
-        unfinished = result.scalar_one_or_none()
-        if unfinished:
-            unfinished.reminder_sent = True
-            await session.commit()
+        return result.all()
+
+
+async def update_reminder_progress(progress: List[dict], session: Optional[AsyncSession] = None):
+    """Записать новые reminder_step/next_reminder_at/reminder_sent пачкой
+
+    Элементы: {'user_id', 'reminder_step', 'next_reminder_at', 'reminder_sent'}.
+    Один UPDATE ... WHERE user_id IN (...) на каждую пару (шаг, закончена ли
+    последовательность); разные next_reminder_at внутри неё — через CASE по user_id.
+    Остановленные за это время последовательности (next_reminder_at IS NULL) не трогаются.
+    """
+    if not progress:
+        return
+    table = UnfinishedApplication.__table__
+    groups = defaultdict(dict)
+    for item in progress:
+        groups[(item['reminder_step'], item['reminder_sent'])][item['user_id']] = item['next_reminder_at']
+    
+    async def write(session: AsyncSession):
+        for (step, sent), next_at in groups.items():
+            due_times = set(next_at.values())
+            await session.execute(
+                update(table)
+                .where(and_(table.c.user_id.in_(list(next_at)), table.c.next_reminder_at.is_not(None)))
+                .values(
+                    reminder_step=step,
+                    next_reminder_at=due_times.pop() if len(due_times) == 1 else case(next_at, value=table.c.user_id),
+                    reminder_sent=sent
+                )
+            )
+    
+    await run_write(write, session)
+
+
+async def stop_reminders(user_id: int, session: Optional[AsyncSession] = None):
+    """Остановить последовательность напоминаний (пользователь отменил заявку)"""
+    async def write(session: AsyncSession):
+        await session.execute(
+            update(UnfinishedApplication)
+            .where(UnfinishedApplication.user_id == user_id)
+            .values(next_reminder_at=None)
+        )
+    
+    await run_write(write, session)
+    reminder_scheduler.cancel(user_id)
+
+
+async def mark_reminders_sent(user_ids: List[int], session: Optional[AsyncSession] = None):
+    """Завершить последовательность напоминаний одним UPDATE"""
+    if not user_ids:
+        return
+    
+    async def write(session: AsyncSession):
+        await session.execute(
+            update(UnfinishedApplication)
+            .where(UnfinishedApplication.user_id.in_(user_ids))
+            .values(reminder_sent=True, next_reminder_at=None)
+        )
+    
+    await run_write(write, session)
+
+
+async def mark_reminder_sent(user_id: int, session: Optional[AsyncSession] = None):
+    """Отметить, что напоминание отправлено"""
+    await mark_reminders_sent([user_id], session=session)
+
 
+async def get_recent_applications_count(hours: int = 1, session: Optional[AsyncSession] = None) -> int:
+    """Получить количество заявок за последние N часов
 
-async def get_recent_applications_count(hours: int = 1) -> int:
-    """Получить количество заявок за последние N часов"""
-    async with async_session() as session:
+    До суток отвечает скользящий счётчик в памяти, без запроса к БД.
+    """
+    if recent_applications.covers(hours):
+        return recent_applications.count(hours)
+    async with session_scope(session) as session:
         time_ago = datetime.utcnow() - timedelta(hours=hours)
         result = await session.execute(
             select(func.count(Application.id)).where(
@@ -142,9 +347,9 @@ async def get_recent_applications_count(hours: int = 1) -> int:
         return result.scalar() or 0
 
 
-async def get_recent_applications(limit: int = 5) -> List[Application]:
+async def get_recent_applications(limit: int = 5, session: Optional[AsyncSession] = None) -> List[Application]:
     """Получить последние заявки"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         result = await session.execute(
             select(Application)
             .order_by(Application.created_at.desc())
@@ -153,21 +358,9 @@ async def get_recent_applications(limit: int = 5) -> List[Application]:
         return result.scalars().all()
 
 
-async def get_random_reviews(limit: int = 3) -> List[Review]:
-    """Получить случайные отзывы"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Review)
-            .where(Review.is_active == True)
-            .order_by(func.random())
-            .limit(limit)
-        )
-        return result.scalars().all()
-
-
-async def add_review(name: str, country: str, text: str, profit: Optional[str] = None) -> Review:
+async def add_review(name: str, country: str, text: str, profit: Optional[str] = None, session: Optional[AsyncSession] = None) -> Review:
     """Добавить отзыв"""
-    async with async_session() as session:
+    async def write(session: AsyncSession) -> Review:
         review = Review(
             name=name,
             country=country,
@@ -175,27 +368,33 @@ async def add_review(name: str, country: str, text: str, profit: Optional[str] =
             profit=profit
         )
         session.add(review)
-        await session.commit()
+        await session.flush()
         return review
+    
+    review = await run_write(write, session)
+    review_pool.invalidate()
+    return review
 
 
-async def mark_application_processed(user_id: int) -> bool:
+async def mark_application_processed(user_id: int, session: Optional[AsyncSession] = None) -> bool:
     """Отметить заявку как обработанную"""
-    async with async_session() as session:
+    async def write(session: AsyncSession) -> bool:
         result = await session.execute(
             select(Application).where(Application.user_id == user_id)
         )
         application = result.scalar_one_or_none()
         if application:
             application.is_processed = True
-            await session.commit()
+            await session.flush()
             return True
         return False
+    
+    return await run_write(write, session)
 
 
-async def get_all_applications(limit: int = 100) -> List[Application]:
+async def get_all_applications(limit: int = 100, session: Optional[AsyncSession] = None) -> List[Application]:
     """Получить все заявки"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         result = await session.execute(
             select(Application)
             .order_by(Application.created_at.desc())
@@ -204,9 +403,9 @@ async def get_all_applications(limit: int = 100) -> List[Application]:
         return result.scalars().all()
 
 
-async def get_unprocessed_applications() -> List[Application]:
+async def get_unprocessed_applications(session: Optional[AsyncSession] = None) -> List[Application]:
     """Получить необработанные заявки"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         result = await session.execute(
             select(Application)
             .where(Application.is_processed == False)
@@ -215,21 +414,23 @@ async def get_unprocessed_applications() -> List[Application]:
         return result.scalars().all()
 
 
-async def save_referral(referrer_id: int, referred_id: int):
+async def save_referral(referrer_id: int, referred_id: int, session: Optional[AsyncSession] = None):
     """Сохранить реферальную связь"""
-    async with async_session() as session:
+    async def write(session: AsyncSession) -> Referral:
         referral = Referral(
             referrer_id=referrer_id,
             referred_id=referred_id
         )
         session.add(referral)
-        await session.commit()
+        await session.flush()
         return referral
+    
+    return await run_write(write, session)
 
 
-async def get_user_referrals_count(user_id: int) -> int:
+async def get_user_referrals_count(user_id: int, session: Optional[AsyncSession] = None) -> int:
     """Получить количество приглашенных пользователей"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         result = await session.execute(
             select(func.count(Referral.id)).where(
                 Referral.referrer_id == user_id
@@ -238,9 +439,9 @@ async def get_user_referrals_count(user_id: int) -> int:
         return result.scalar() or 0
 
 
-async def get_referrer_by_user_id(user_id: int) -> Optional[int]:
+async def get_referrer_by_user_id(user_id: int, session: Optional[AsyncSession] = None) -> Optional[int]:
     """Получить ID пригласившего по ID пользователя"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         result = await session.execute(
             select(Application.referred_by).where(
                 Application.user_id == user_id
@@ -251,36 +452,111 @@ async def get_referrer_by_user_id(user_id: int) -> Optional[int]:
 
 # === ФУНКЦИИ ДЛЯ РАБОТЫ С БАЙЕРАМИ ===
 
-async def get_buyer_by_code(buyer_code: str) -> Optional[Buyer]:
-    """Получить байера по коду"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Buyer).where(Buyer.buyer_code == buyer_code)
-        )
-        return result.scalar_one_or_none()
+async def get_buyer_by_code(buyer_code: str, session: Optional[AsyncSession] = None) -> Optional[BuyerSnapshot]:
+    """Получить байера по коду (снимок из кеша вместе с pixel_config)"""
+    return await buyers.get(buyer_code, session=session)
 
 
-async def increment_buyer_stats(buyer_code: str):
-    """Увеличить счетчик лидов байера"""
-    async with async_session() as session:
-        buyer = await session.execute(
-            select(Buyer).where(Buyer.buyer_code == buyer_code)
+async def update_buyer(buyer_code: str, session: Optional[AsyncSession] = None, **values):
+    """Изменить поля байера и сбросить его в кеше"""
+    async def write(session: AsyncSession):
+        await session.execute(
+            update(Buyer).where(Buyer.buyer_code == buyer_code).values(**values)
         )
-        buyer = buyer.scalar_one_or_none()
-        if buyer:
-            buyer.total_leads += 1
-            await session.commit()
-
-
-async def log_postback(buyer_id: int, application_id: int, status: str, response_code: int = None, response_text: str = None):
+    
+    await run_write(write, session)
+    buyers.invalidate(buyer_code)
+    if 'buyer_code' in values:
+        buyers.invalidate(values['buyer_code'])
+
+
+async def increment_buyer_stats(buyer_code: str, leads: int = 1, applications: int = 0, session: Optional[AsyncSession] = None):
+    """Увеличить счетчики лидов/заявок байера
+
+    Запись отложенная: приращения копятся в `buyer_stats` и уходят
+    атомарным UPDATE раз в BUYER_STATS_FLUSH_INTERVAL секунд.
+    """
+    buyer_stats.add(buyer_code, leads=leads, applications=applications)
+
+
+async def log_postback(
+    buyer_id: int,
+    application_id: int,
+    status: str,
+    response_code: int = None,
+    response_text: str = None,
+    network: Optional[str] = None,
+    attempt: int = 1,
+    session: Optional[AsyncSession] = None
+):
     """Логировать отправку postback"""
-    async with async_session() as session:
+    async def write(session: AsyncSession):
         log = PostbackLog(
             buyer_id=buyer_id,
             application_id=application_id,
+            network=network,
             status=status,
             response_code=response_code,
-            response_text=response_text
+            response_text=response_text,
+            attempt=attempt
         )
         session.add(log)
-        await session.commit()
+        await session.flush()
+    
+    await run_write(write, session)
+
+
+async def log_postbacks(rows: List[dict], session: Optional[AsyncSession] = None):
+    """Логировать отправку сразу нескольких postback одним INSERT"""
+    if not rows:
+        return
+    
+    async def write(session: AsyncSession):
+        await session.execute(insert(PostbackLog), rows)
+    
+    await run_write(write, session)
+
+
+async def acquire_lease(name: str, holder: str, ttl: float, session: Optional[AsyncSession] = None) -> bool:
+    """Взять или продлить аренду `name` на `ttl` секунд
+
+    Аренда достаётся, если её нет, она истекла или уже принадлежит `holder`.
+    Это один атомарный INSERT ... ON CONFLICT DO UPDATE ... WHERE, поэтому
+    из одновременных претендентов строку получает только один.
+    """
+    now = datetime.utcnow()
+    
+    async def write(session: AsyncSession) -> bool:
+        stmt = _upsert(session, JobLease).values(
+            name=name,
+            holder=holder,
+            acquired_at=now,
+            expires_at=now + timedelta(seconds=ttl)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[JobLease.name],
+            set_={
+                'holder': stmt.excluded.holder,
+                'expires_at': stmt.excluded.expires_at,
+                # При продлении время получения аренды не меняется
+                'acquired_at': case(
+                    (JobLease.holder == stmt.excluded.holder, JobLease.acquired_at),
+                    else_=stmt.excluded.acquired_at
+                )
+            },
+            where=or_(JobLease.expires_at < now, JobLease.holder == stmt.excluded.holder)
+        )
+        # Строка возвращается, только если её вставили или обновили
+        return (await session.execute(stmt.returning(JobLease.name))).first() is not None
+    
+    return await run_write(write, session)
+
+
+async def release_lease(name: str, holder: str, session: Optional[AsyncSession] = None):
+    """Отпустить аренду, чтобы её сразу мог взять другой экземпляр"""
+    async def write(session: AsyncSession):
+        await session.execute(
+            delete(JobLease).where(JobLease.name == name, JobLease.holder == holder)
+        )
+    
+    await run_write(write, session)
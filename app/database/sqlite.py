@@ -0,0 +1,58 @@
+"""
+Профиль SQLite для работы бота на файле базы
+
+При каждом новом соединении включаются WAL, `synchronous`, `mmap_size`,
+`busy_timeout` и размер кеша страниц. В WAL читатели не блокируют
+писателя и не ждут его, а конфликтуют между собой только записи.
+
+Транзакции начинаются явным BEGIN вместо неявного BEGIN драйвера
+sqlite3 (он откладывает его до первой записи и ломает SAVEPOINT).
+Соединения с опцией `sqlite_immediate` начинают BEGIN IMMEDIATE: блокировка
+записи берётся сразу и ожидается по `busy_timeout`, а не отказывает
+посреди транзакции при попытке перейти от чтения к записи.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import (
+    SQLITE_PROFILE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE
+)
+
+
+def uses_sqlite_profile(database_url) -> bool:
+    """Включён ли профиль для этой базы: только SQLite в файле"""
+    url = make_url(database_url)
+    return (
+        SQLITE_PROFILE
+        and url.get_backend_name() == 'sqlite'
+        and url.database not in (None, '', ':memory:')
+    )
+
+
+def apply_sqlite_profile(engine: AsyncEngine):
+    """Подписать прагмы и явный BEGIN на события движка"""
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        # Транзакциями управляет SQLAlchemy (событие begin ниже)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        # Отрицательное значение — размер в КиБ, а не в страницах
+        cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE}')
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, 'begin')
+    def on_begin(conn):
+        if conn.get_execution_options().get('sqlite_immediate'):
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            conn.exec_driver_sql('BEGIN')
@@ -0,0 +1,182 @@
+"""
+Единственный писатель SQLite: короткие записи пачками в одной транзакции
+
+SQLite допускает одну пишущую транзакцию на файл. Если каждый хендлер
+пишет сам, транзакции ждут друг друга по `busy_timeout` и при нагрузке
+падают с "database is locked". Здесь записи ставятся в очередь, а одна
+задача выполняет всё, что накопилось, в одной транзакции BEGIN IMMEDIATE:
+каждая запись — в своём SAVEPOINT, коммит один на пачку. Ошибка одной
+записи откатывает только её SAVEPOINT и возвращается её вызывающему.
+
+Запись — `async def op(session)` без commit. Писатель работает только
+с профилем SQLite (см. app.database.sqlite); без него `run_write`
+выполняет запись в сессии вызывающего и коммитит её.
+
+Соединение писатель держит своё: хендлеры ждут его, не отдавая
+соединения сессии апдейта, и при занятом пуле он бы до него не дождался.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.config import DATABASE_URL, SQLITE_WRITE_BATCH
+from app.database.models import engine, session_scope
+from app.database.sqlite import uses_sqlite_profile
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class SqliteWriter:
+    """Очередь записей и фоновая задача, которая выполняет их пачками
+
+    Пачка — всё, что накопилось в очереди к началу транзакции, но не
+    больше `batch_size` записей. Отдельного ожидания нет: пока идёт одна
+    транзакция, в очереди собирается следующая пачка.
+    """
+
+    def __init__(self, batch_size: int = SQLITE_WRITE_BATCH):
+        self.batch_size = batch_size
+        self.enabled = uses_sqlite_profile(DATABASE_URL)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[AsyncConnection] = None
+
+        # Метрики
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.last_batch_latency = 0.0
+        self.max_batch_latency = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Записи идут через очередь писателя"""
+        return self._task is not None
+
+    @property
+    def queue_depth(self) -> int:
+        """Количество записей, ожидающих транзакции"""
+        return self._queue.qsize()
+
+    def start(self):
+        """Запустить писателя (если профиль SQLite включён)"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить писателя, выполнив записи из очереди"""
+        if self._task is None:
+            return
+        # Метка остановки: задача допишет всё, что стоит перед ней
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        while not self._queue.empty():
+            await self._write([item for item in self._take_batch() if item is not None])
+        await self._disconnect()
+
+    async def submit(self, op: WriteOp) -> Any:
+        """Поставить запись в очередь и дождаться её коммита"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, future))
+        return await future
+
+    def stats(self) -> dict:
+        """Метрики писателя"""
+        return {
+            'queue_depth': self.queue_depth,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+            'max_batch': self.max_batch,
+            'last_batch_latency_ms': round(self.last_batch_latency * 1000, 2),
+            'max_batch_latency_ms': round(self.max_batch_latency * 1000, 2)
+        }
+
+    def _take_batch(self, batch: Optional[list] = None) -> List[Tuple[WriteOp, asyncio.Future]]:
+        batch = batch or []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = self._take_batch([await self._queue.get()])
+            ops = [item for item in batch if item is not None]
+            if ops:
+                await self._write(ops)
+            if len(ops) < len(batch):
+                return
+
+    async def _write(self, batch: List[Tuple[WriteOp, asyncio.Future]]):
+        started = time.perf_counter()
+        results = []
+        try:
+            if self._connection is None:
+                self._connection = await engine.connect()
+                await self._connection.execution_options(sqlite_immediate=True)
+            async with AsyncSession(bind=self._connection, expire_on_commit=False) as session:
+                for op, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            results.append((future, await op(session), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+                await session.commit()
+        except Exception as e:
+            # Транзакция не началась или не закоммитилась: не записано ничего
+            logger.error(f"Ошибка транзакции писателя SQLite ({len(batch)} записей): {e}")
+            results = [(future, None, e) for _, future in batch]
+            await self._disconnect()
+        finally:
+            latency = time.perf_counter() - started
+            self.last_batch_latency = latency
+            self.max_batch_latency = max(self.max_batch_latency, latency)
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+
+        for future, result, error in results:
+            if error is not None:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                self.written += 1
+                if not future.done():
+                    future.set_result(result)
+
+    async def _disconnect(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning(f"Писатель SQLite: ошибка закрытия соединения: {e}")
+
+
+sqlite_writer = SqliteWriter()
+
+
+async def run_write(op: WriteOp, session: Optional[AsyncSession] = None) -> Any:
+    """Выполнить запись через писателя SQLite или в сессии с коммитом
+
+    Через писателя запись идёт в его сессии, а не в переданной: объекты
+    результата отсоединены, а открытая транзакция переданной сессии
+    увидит запись только после своего завершения.
+    """
+    if sqlite_writer.running:
+        return await sqlite_writer.submit(op)
+    async with session_scope(session) as session:
+        try:
+            result = await op(session)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return result
@@ -0,0 +1,84 @@
+"""
+Команды администратора: массовая рассылка
+"""
+import asyncio
+import logging
+
+from aiogram import Router, F, Bot
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from app.config import ADMIN_ID, BROADCAST_PROGRESS_INTERVAL
+from app.services.broadcast import broadcast_engine
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.filter(F.from_user.id == ADMIN_ID)
+
+
+def format_progress(snapshot: dict) -> str:
+    """Текст прогресса рассылки"""
+    status = "завершена" if snapshot['finished'] else "идёт"
+    return (
+        f"📣 Рассылка #{snapshot['id']} ({status})\n"
+        f"Отправлено: {snapshot['sent']} из {snapshot['total']}\n"
+        f"Заблокировали бота: {snapshot['blocked']}\n"
+        f"Ошибок: {snapshot['failed']}\n"
+        f"Скорость: {snapshot['per_sec']} сообщ./с"
+    )
+
+
+async def report_progress(status_message: Message, broadcast_id: int, task: asyncio.Task):
+    """Обновлять сообщение с прогрессом, пока рассылка идёт"""
+    last_text = None
+    while True:
+        finished = task.done()
+        progress = broadcast_engine.progress.get(broadcast_id)
+        if progress is not None:
+            text = format_progress(progress.snapshot())
+            if text != last_text:
+                try:
+                    await status_message.edit_text(text)
+                    last_text = text
+                except Exception as e:
+                    logger.debug(f"Не удалось обновить прогресс рассылки: {e}")
+        if finished:
+            return
+        await asyncio.wait({task}, timeout=BROADCAST_PROGRESS_INTERVAL)
+
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast(message: Message, command: CommandObject, bot: Bot):
+    """/broadcast <текст> — разослать текст всем пользователям"""
+    if not command.args:
+        await message.answer("Использование: /broadcast <текст сообщения>")
+        return
+    broadcast = await broadcast_engine.create(command.args, created_by=message.from_user.id)
+    task = broadcast_engine.start(bot, broadcast)
+    status_message = await message.answer(f"📣 Рассылка #{broadcast.id} запущена, получателей: {broadcast.total}")
+    asyncio.create_task(report_progress(status_message, broadcast.id, task))
+
+
+@router.message(Command("broadcast_status"))
+async def cmd_broadcast_status(message: Message):
+    """Прогресс рассылок, запущенных в этом процессе"""
+    if not broadcast_engine.progress:
+        await message.answer("Рассылок нет")
+        return
+    await message.answer(
+        "\n\n".join(format_progress(progress.snapshot()) for progress in broadcast_engine.progress.values())
+    )
+
+
+@router.message(Command("broadcast_cancel"))
+async def cmd_broadcast_cancel(message: Message, command: CommandObject):
+    """/broadcast_cancel <id> — остановить рассылку"""
+    if not command.args or not command.args.strip().isdigit():
+        await message.answer("Использование: /broadcast_cancel <id>")
+        return
+    broadcast_id = int(command.args.strip())
+    if await broadcast_engine.cancel(broadcast_id):
+        await message.answer(f"Рассылка #{broadcast_id} остановлена")
+    else:
+        await message.answer(f"Рассылка #{broadcast_id} не найдена или уже завершена")
@@ -8,9 +8,14 @@ from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import MESSAGES, ADMIN_ID
 from app.states.application import ApplicationStates
+from app.utils.attribution import clear_state
+from app.cache.counters import recent_applications
+from app.cache.countries import latest_joiners
 from app.keyboards.user import (
     get_phone_keyboard, 
     get_contact_time_keyboard,
@@ -20,11 +25,13 @@ from app.keyboards.user import (
     get_application_navigation_keyboard
 )
 from app.database.queries import (
+    ApplicationAlreadyExists,
     create_application, 
     user_has_application,
     save_unfinished_application,
     get_recent_applications_count,
-    get_recent_applications
+    increment_buyer_stats,
+    stop_reminders
 )
 
 router = Router(name="application")
@@ -42,20 +49,23 @@ def get_social_proof() -> str:
     """Генерирует социальное доказательство"""
     import random
     messages = [
-        "💫 За последний час записалось 7 человек",
         "🔥 Осталось 12 мест в группе",
         "⚡ Михаил из Германии только что записался",
         "🎯 Уже 89 человек проходят обучение",
         "✨ Анна из Франции начала зарабатывать 1500€/мес"
     ]
+    # Реальное число записавшихся из счётчика в памяти
+    joined = recent_applications.count(hours=1)
+    if joined > 0:
+        messages.append(f"💫 За последний час записалось {joined} человек(а)")
     return random.choice(messages)
 
 
 @router.callback_query(F.data == "start_application")
-async def start_application(callback: CallbackQuery, state: FSMContext):
+async def start_application(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Начало процесса заявки"""
     # Проверяем, нет ли уже заявки
-    if await user_has_application(callback.from_user.id):
+    if await user_has_application(callback.from_user.id, session=session):
         await callback.message.edit_text(
             MESSAGES['already_applied'],
             reply_markup=get_after_application_keyboard(),
@@ -85,14 +95,15 @@ async def start_application(callback: CallbackQuery, state: FSMContext):
         user_id=callback.from_user.id,
         username=callback.from_user.username,
         current_step="name",
-        data={}
+        data={},
+        session=session
     )
     
     await callback.answer()
 
 
 @router.message(ApplicationStates.waiting_for_name)
-async def process_name(message: Message, state: FSMContext):
+async def process_name(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка имени"""
     name = message.text.strip()
     
@@ -117,7 +128,7 @@ async def process_name(message: Message, state: FSMContext):
     text += MESSAGES['ask_country']
     
     # Показываем недавние заявки
-    recent_count = await get_recent_applications_count(hours=1)
+    recent_count = await get_recent_applications_count(hours=1, session=session)
     if recent_count > 0:
         text += f"\n\n<i>💡 За последний час к нам присоединилось {recent_count} человек(а)</i>"
     
@@ -133,14 +144,15 @@ async def process_name(message: Message, state: FSMContext):
         user_id=message.from_user.id,
         username=message.from_user.username,
         current_step="country",
-        data=data
+        data=data,
+        session=session
     )
     
     await state.set_state(ApplicationStates.waiting_for_country)
 
 
 @router.message(ApplicationStates.waiting_for_country)
-async def process_country(message: Message, state: FSMContext):
+async def process_country(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка страны"""
     country = message.text.strip()
     
@@ -164,12 +176,10 @@ async def process_country(message: Message, state: FSMContext):
     text += f"Супер, {data['name']}! "
     text += MESSAGES['ask_phone']
     
-    # Показываем последнюю заявку из этой страны
-    recent_apps = await get_recent_applications(limit=10)
-    for app in recent_apps:
-        if app.country.lower() == country.lower():
-            text += f"\n\n<i>🌍 Кстати, из {country} недавно записался {app.name}</i>"
-            break
+    # Показываем последнего записавшегося из этой страны (индекс в памяти)
+    latest_name = latest_joiners.get(country)
+    if latest_name:
+        text += f"\n\n<i>🌍 Кстати, из {country} недавно записался {latest_name}</i>"
     
     await message.answer(
         text,
@@ -182,14 +192,15 @@ async def process_country(message: Message, state: FSMContext):
         user_id=message.from_user.id,
         username=message.from_user.username,
         current_step="phone",
-        data=data
+        data=data,
+        session=session
     )
     
     await state.set_state(ApplicationStates.waiting_for_phone)
 
 
 @router.message(ApplicationStates.waiting_for_phone)
-async def process_phone(message: Message, state: FSMContext):
+async def process_phone(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка номера телефона"""
     phone = None
     
@@ -240,14 +251,15 @@ async def process_phone(message: Message, state: FSMContext):
         user_id=message.from_user.id,
         username=message.from_user.username,
         current_step="contact_time",
-        data=data
+        data=data,
+        session=session
     )
     
     await state.set_state(ApplicationStates.waiting_for_contact_time)
 
 
 @router.callback_query(ApplicationStates.waiting_for_contact_time, F.data.startswith("time:"))
-async def process_contact_time(callback: CallbackQuery, state: FSMContext, bot: Bot):
+async def process_contact_time(callback: CallbackQuery, state: FSMContext, bot: Bot, session: AsyncSession):
     """Обработка времени связи"""
     # Получаем время из callback data
     contact_time = callback.data.split(":", 1)[1]
@@ -267,8 +279,13 @@ async def process_contact_time(callback: CallbackQuery, state: FSMContext, bot:
             country=data['country'],
             phone=data['phone'],
             contact_time=contact_time,
-            referred_by=referred_by
+            referred_by=referred_by,
+            buyer_id=data.get('buyer_id'),
+            click_id=data.get('click_id'),
+            session=session
         )
+        if data.get('buyer_code'):
+            await increment_buyer_stats(data['buyer_code'], leads=0, applications=1)
         
         # Отправляем подтверждение пользователю с клавиатурой
         await callback.message.edit_text(
@@ -299,6 +316,15 @@ async def process_contact_time(callback: CallbackQuery, state: FSMContext, bot:
         # Очищаем состояние
         await state.clear()
         
+    except ApplicationAlreadyExists:
+        # Повторное нажатие или заявка из другой сессии
+        await state.clear()
+        await callback.message.edit_text(
+            MESSAGES['already_applied'],
+            reply_markup=get_after_application_keyboard(),
+            parse_mode="HTML"
+        )
+        
     except Exception as e:
         print(f"Ошибка создания заявки: {e}")
         await callback.message.edit_text(
@@ -310,19 +336,17 @@ async def process_contact_time(callback: CallbackQuery, state: FSMContext, bot:
 
 
 @router.callback_query(F.data == "continue_application")
-async def continue_application(callback: CallbackQuery, state: FSMContext):
+async def continue_application(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Продолжить заполнение заявки после напоминания"""
     # Получаем незавершенную заявку из БД
-    from app.database.models import async_session, UnfinishedApplication
-    from sqlalchemy import select
+    from app.database.models import UnfinishedApplication
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(UnfinishedApplication).where(
-                UnfinishedApplication.user_id == callback.from_user.id
-            )
+    result = await session.execute(
+        select(UnfinishedApplication).where(
+            UnfinishedApplication.user_id == callback.from_user.id
         )
-        unfinished = result.scalar_one_or_none()
+    )
+    unfinished = result.scalar_one_or_none()
     
     if not unfinished:
         await callback.message.edit_text(
@@ -391,9 +415,10 @@ async def continue_application(callback: CallbackQuery, state: FSMContext):
 
 @router.message(F.text == "❌ Отмена")
 @router.callback_query(F.data == "cancel_application")
-async def cancel_application(update: Message | CallbackQuery, state: FSMContext):
+async def cancel_application(update: Message | CallbackQuery, state: FSMContext, session: AsyncSession):
     """Отмена заявки"""
-    await state.clear()
+    await clear_state(state)
+    await stop_reminders(update.from_user.id, session=session)
     
     if isinstance(update, CallbackQuery):
         await update.message.edit_text(
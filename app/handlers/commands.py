@@ -6,6 +6,7 @@ from aiogram.types import Message
 from aiogram.filters import Command
 
 from app.config import MESSAGES
+from app.cache.reviews import review_pool
 from app.keyboards.user import get_info_keyboard, get_back_to_start_keyboard
 
 router = Router(name="commands")
@@ -59,19 +60,8 @@ async def cmd_faq(message: Message):
 @router.message(Command("reviews"))
 async def cmd_reviews(message: Message):
     """Отзывы"""
-    from app.database.queries import get_random_reviews
-    
-    reviews = await get_random_reviews(limit=3)
-    
-    text = "<b>💬 Отзывы наших выпускников:</b>\n\n"
-    
-    for review in reviews:
-        text += f"<b>{review.name}</b> ({review.country})"
-        if review.profit:
-            text += f" - <i>{review.profit}</i>"
-        text += f"\n{review.text}\n\n"
-    
-    text += "<i>Это лишь малая часть отзывов. Присоединяйтесь к успешным выпускникам!</i>"
+    # Отзывы берутся из пула в памяти, блоки уже отформатированы
+    text = await review_pool.render(limit=3)
     
     await message.answer(
         text,
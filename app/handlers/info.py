@@ -1,27 +1,31 @@
 """
 Обработчики информационных разделов
 """
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import MESSAGES
 from app.keyboards.user import get_info_keyboard, get_back_to_start_keyboard, get_after_application_keyboard
 from app.database.queries import user_has_application
+from app.cache.reviews import review_pool
 
 router = Router(name="info")
 
 
-async def get_keyboard_for_user(user_id: int):
+async def get_keyboard_for_user(user_id: int, session: Optional[AsyncSession] = None):
     """Возвращает клавиатуру в зависимости от статуса пользователя"""
-    if await user_has_application(user_id):
+    if await user_has_application(user_id, session=session):
         return get_after_application_keyboard()
     return get_info_keyboard()
 
 
 @router.callback_query(F.data == "show_faq")
-async def show_faq(callback: CallbackQuery):
+async def show_faq(callback: CallbackQuery, session: AsyncSession):
     """Показать FAQ"""
-    keyboard = await get_keyboard_for_user(callback.from_user.id)
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
     await callback.message.edit_text(
         MESSAGES['faq'],
         reply_markup=keyboard,
@@ -31,9 +35,9 @@ async def show_faq(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "show_why_crypto")
-async def show_why_crypto(callback: CallbackQuery):
+async def show_why_crypto(callback: CallbackQuery, session: AsyncSession):
     """Показать почему криптовалюта"""
-    keyboard = await get_keyboard_for_user(callback.from_user.id)
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
     await callback.message.edit_text(
         MESSAGES['why_crypto'],
         reply_markup=keyboard,
@@ -43,9 +47,9 @@ async def show_why_crypto(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "show_program")
-async def show_program(callback: CallbackQuery):
+async def show_program(callback: CallbackQuery, session: AsyncSession):
     """Показать программу курса"""
-    keyboard = await get_keyboard_for_user(callback.from_user.id)
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
     await callback.message.edit_text(
         MESSAGES['program'],
         reply_markup=keyboard,
@@ -55,9 +59,9 @@ async def show_program(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "show_guarantees")
-async def show_guarantees(callback: CallbackQuery):
+async def show_guarantees(callback: CallbackQuery, session: AsyncSession):
     """Показать гарантии"""
-    keyboard = await get_keyboard_for_user(callback.from_user.id)
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
     await callback.message.edit_text(
         MESSAGES['guarantees'],
         reply_markup=keyboard,
@@ -67,9 +71,9 @@ async def show_guarantees(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "show_about")
-async def show_about(callback: CallbackQuery):
+async def show_about(callback: CallbackQuery, session: AsyncSession):
     """Показать информацию о нас"""
-    keyboard = await get_keyboard_for_user(callback.from_user.id)
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
     await callback.message.edit_text(
         MESSAGES['about_us'],
         reply_markup=keyboard,
@@ -79,12 +83,24 @@ async def show_about(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "show_success_stories")
-async def show_success_stories(callback: CallbackQuery):
+async def show_success_stories(callback: CallbackQuery, session: AsyncSession):
     """Показать истории успеха"""
-    keyboard = await get_keyboard_for_user(callback.from_user.id)
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
     await callback.message.edit_text(
         MESSAGES['success_stories'],
         reply_markup=keyboard,
         parse_mode="HTML"
     )
     await callback.answer()
+
+
+@router.callback_query(F.data == "show_reviews")
+async def show_reviews(callback: CallbackQuery, session: AsyncSession):
+    """Показать отзывы"""
+    keyboard = await get_keyboard_for_user(callback.from_user.id, session)
+    await callback.message.edit_text(
+        await review_pool.render(limit=3),
+        reply_markup=keyboard,
+        parse_mode="HTML"
+    )
+    await callback.answer()
@@ -1,18 +1,21 @@
 """
 Обработчик реферальной системы
 """
+from typing import Optional
+
 from aiogram import Router, F, Bot
 from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import MESSAGES
+from app.cache.referrers import referrer_names
 from app.database.queries import (
     user_has_application, 
     get_user_referrals_count,
-    save_referral,
-    get_application_by_user_id
+    save_referral
 )
 
 router = Router(name="referral")
@@ -54,10 +57,10 @@ def get_share_keyboard(referral_link: str, share_text: str) -> InlineKeyboardMar
 
 
 @router.callback_query(F.data == "show_referral_program")
-async def show_referral_program(callback: CallbackQuery, bot: Bot):
+async def show_referral_program(callback: CallbackQuery, bot: Bot, session: AsyncSession):
     """Показать реферальную программу"""
     # Проверяем, есть ли у пользователя заявка
-    if not await user_has_application(callback.from_user.id):
+    if not await user_has_application(callback.from_user.id, session=session):
         await callback.answer("Сначала нужно записаться на курс!", show_alert=True)
         return
     
@@ -69,7 +72,7 @@ async def show_referral_program(callback: CallbackQuery, bot: Bot):
     referral_link = generate_referral_link(callback.from_user.id, bot_username)
     
     # Получаем количество приглашенных
-    referrals_count = await get_user_referrals_count(callback.from_user.id)
+    referrals_count = await get_user_referrals_count(callback.from_user.id, session=session)
     
     # Формируем текст
     text = MESSAGES['referral_program'].format(referral_link=referral_link)
@@ -90,23 +93,25 @@ async def show_referral_program(callback: CallbackQuery, bot: Bot):
     await callback.answer()
 
 
-async def process_referral_link(message: Message, state: FSMContext, referrer_id: int):
-    """Обработка реферальной ссылки"""
+async def process_referral_link(message: Message, state: FSMContext, referrer_id: int, session: Optional[AsyncSession] = None) -> Optional[int]:
+    """Обработка реферальной ссылки; возвращает id реферера, если ссылка засчитана"""
     try:
         # Проверяем, что это не сам пользователь
         if referrer_id == message.from_user.id:
-            return
+            return None
         
-        # Проверяем, есть ли у реферера заявка
-        referrer_app = await get_application_by_user_id(referrer_id)
-        if referrer_app:
+        # Рефер — только пользователь с заявкой; имя берётся из кеша
+        referrer_name = await referrer_names.get(referrer_id, session=session)
+        if referrer_name:
             # Отправляем специальное приветствие
             welcome_text = MESSAGES['referred_welcome'].format(
-                referrer_name=referrer_app.name
+                referrer_name=referrer_name
             )
             await message.answer(welcome_text, parse_mode="HTML")
             
             # Сохраняем информацию о реферале в состоянии
             await state.update_data(referred_by=referrer_id)
+            return referrer_id
     except Exception as e:
         print(f"Ошибка обработки реферальной ссылки: {e}")
+    return None
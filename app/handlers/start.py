@@ -1,44 +1,70 @@
 """
 Обработчик команды /start
 """
+import logging
+
 from aiogram import Router, types, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 
 from app.keyboards import get_start_keyboard
-from app.database.models import async_session, User
-from sqlalchemy import select
+from app.database.queries import register_user, get_buyer_by_code, increment_buyer_stats
+from app.handlers.referral import process_referral_link
+from app.utils.attribution import parse_start_payload, clear_state
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
 
+async def attribute_start(message: types.Message, state: FSMContext, payload: str, session: AsyncSession) -> dict:
+    """Атрибуция по payload /start: сохраняет её в FSM и возвращает поля для users
+
+    Байеры и рефереры берутся из кешей, так что на попадании в кеш
+    запросов к БД нет.
+    """
+    parsed = parse_start_payload(payload)
+    if parsed is None:
+        return {}
+    
+    if parsed.referrer_id is not None:
+        referrer_id = await process_referral_link(message, state, parsed.referrer_id, session=session)
+        return {'referred_by': referrer_id} if referrer_id else {}
+    
+    buyer = await get_buyer_by_code(parsed.buyer_code, session=session)
+    if buyer is None or not buyer.is_active:
+        return {}
+    
+    # Повторный переход по той же ссылке — не новый лид
+    data = await state.get_data()
+    if data.get('buyer_code') != buyer.buyer_code or data.get('click_id') != parsed.click_id:
+        await increment_buyer_stats(buyer.buyer_code, leads=1)
+    await state.update_data(buyer_id=buyer.id, buyer_code=buyer.buyer_code, click_id=parsed.click_id)
+    return {'buyer_id': buyer.id, 'click_id': parsed.click_id}
+
+
 @router.message(Command("start"))
-async def start_command(message: types.Message, state: FSMContext):
+async def start_command(message: types.Message, state: FSMContext, session: AsyncSession, command: CommandObject):
     """Обработчик команды /start"""
-    # Очищаем состояние
-    await state.clear()
+    # Очищаем состояние (атрибуция прошлых переходов сохраняется)
+    await clear_state(state)
+    
+    attribution = await attribute_start(message, state, command.args, session)
     
-    # Проверяем/создаем пользователя
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.user_id == message.from_user.id)
+    # Создаем пользователя или обновляем его данные; приветствие
+    # отправляем, даже если запись не удалась
+    try:
+        await register_user(
+            user_id=message.from_user.id,
+            username=message.from_user.username,
+            first_name=message.from_user.first_name,
+            last_name=message.from_user.last_name,
+            session=session,
+            **attribution
         )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            try:
-                user = User(
-                    user_id=message.from_user.id,
-                    username=message.from_user.username,
-                    first_name=message.from_user.first_name,
-                    last_name=message.from_user.last_name
-                )
-                session.add(user)
-                await session.commit()
-                print(f"✅ Создан новый пользователь: {user.user_id}")
-            except Exception as e:
-                print(f"❌ Ошибка создания пользователя: {e}")
-                await session.rollback()
+    except Exception:
+        logger.exception(f"Ошибка регистрации пользователя {message.from_user.id}")
     
     # Отправляем приветствие
     await message.answer(
@@ -56,7 +82,7 @@ async def start_command(message: types.Message, state: FSMContext):
 @router.message(F.text == "🏠 Главное меню")
 async def main_menu(message: types.Message, state: FSMContext):
     """Возврат в главное меню"""
-    await state.clear()
+    await clear_state(state)
     await message.answer(
         "🏠 Вы в главном меню.\nВыберите интересующий раздел:",
         reply_markup=get_start_keyboard()
@@ -0,0 +1,6 @@
+"""
+Middlewares бота
+"""
+from .database import DbSessionMiddleware
+
+__all__ = ['DbSessionMiddleware']
@@ -0,0 +1,27 @@
+"""
+Middleware с одной сессией БД на апдейт
+"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.database.models import async_session
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Открывает одну сессию БД на апдейт и передаёт её в хендлеры как `session`
+
+    Соединение берётся из пула только при первом запросе к БД,
+    поэтому апдейты без обращений к базе пул не трогают.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with async_session() as session:
+            data['session'] = session
+            return await handler(event, data)
@@ -0,0 +1,251 @@
+"""
+Массовая рассылка по пользователям бота
+
+Получатели читаются страницами по курсору `user_id > :last_user_id`
+(keyset по уникальному индексу users.user_id), в памяти только одна
+страница. После каждой страницы курсор и счётчики сохраняются в
+`broadcasts`, поэтому после падения рассылка продолжается с последней
+сохранённой страницы (сообщения из недописанной страницы могут уйти
+повторно). Рассылку ведёт держатель аренды `broadcast:<id>` в job_leases,
+поэтому при нескольких экземплярах бота она не уходит дважды, а брошенную
+упавшим экземпляром подхватывает лидер (см. `watch`).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
+from sqlalchemy import select, update, func, or_
+
+from app.config import BROADCAST_PAGE_SIZE, BROADCAST_CHAT_INTERVAL, LEADER_HEARTBEAT_SECONDS
+from app.database.models import Broadcast, User, async_session
+from app.database.sqlite_writer import run_write
+from app.services.leader import Lease
+from app.utils.ratelimit import ChatPacer, telegram_limiter
+
+logger = logging.getLogger(__name__)
+
+SENT = 'sent'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+
+class BroadcastProgress:
+    """Живые счётчики одной рассылки"""
+
+    __slots__ = ('broadcast_id', 'total', 'sent', 'failed', 'blocked', 'started_at', 'finished')
+
+    def __init__(self, broadcast: Broadcast):
+        self.broadcast_id = broadcast.id
+        self.total = broadcast.total or 0
+        self.sent = broadcast.sent
+        self.failed = broadcast.failed
+        self.blocked = broadcast.blocked
+        self.started_at = time.monotonic()
+        self.finished = False
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            'id': self.broadcast_id,
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'blocked': self.blocked,
+            'per_sec': round(self.sent / elapsed, 1) if elapsed else 0.0,
+            'finished': self.finished
+        }
+
+
+class BroadcastEngine:
+    """Запуск, возобновление и отмена рассылок"""
+
+    def __init__(self, page_size: int = BROADCAST_PAGE_SIZE, chat_interval: float = BROADCAST_CHAT_INTERVAL):
+        self.page_size = page_size
+        self.pacer = ChatPacer(chat_interval)
+        self.progress: Dict[int, BroadcastProgress] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    async def create(self, text: str, created_by: Optional[int] = None) -> Broadcast:
+        """Сохранить рассылку; получатели считаются один раз для прогресса"""
+        async def write(session) -> Broadcast:
+            total = await session.scalar(
+                select(func.count()).select_from(User).where(_not_blocked())
+            )
+            broadcast = Broadcast(text=text, created_by=created_by, total=total)
+            session.add(broadcast)
+            await session.flush()
+            return broadcast
+
+        return await run_write(write)
+
+    def start(self, bot: Bot, broadcast: Broadcast) -> asyncio.Task:
+        """Запустить (или продолжить) рассылку в фоне"""
+        task = self._tasks.get(broadcast.id)
+        if task is None or task.done():
+            task = self._tasks[broadcast.id] = asyncio.create_task(self._run(bot, broadcast.id))
+        return task
+
+    async def resume_all(self, bot: Bot) -> int:
+        """Продолжить рассылки без живого держателя (прерванные остановкой или падением)"""
+        async with async_session() as session:
+            result = await session.scalars(select(Broadcast).where(Broadcast.status == 'running'))
+            broadcasts = result.all()
+        started = 0
+        for broadcast in broadcasts:
+            if broadcast.id not in self._tasks:
+                # Если рассылку ведёт другой экземпляр, задача сразу завершится
+                self.start(bot, broadcast)
+                started += 1
+        return started
+
+    async def watch(self, bot: Bot, interval: float = LEADER_HEARTBEAT_SECONDS):
+        """Задача лидера: подхватывать брошенные рассылки"""
+        while True:
+            try:
+                await self.resume_all(bot)
+            except Exception as e:
+                logger.error(f"Ошибка возобновления рассылок: {e}")
+            await asyncio.sleep(interval)
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        """Остановить рассылку; прогресс сохраняется"""
+        async def write(session) -> int:
+            result = await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id, Broadcast.status == 'running')
+                .values(status='cancelled', finished_at=datetime.utcnow())
+            )
+            return result.rowcount
+
+        cancelled = await run_write(write)
+        task = self._tasks.pop(broadcast_id, None)
+        if task is not None:
+            task.cancel()
+        return cancelled > 0
+
+    async def stop(self):
+        """Прервать рассылки при остановке бота (status остаётся running)"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, bot: Bot, broadcast_id: int):
+        lease = Lease(f"broadcast:{broadcast_id}")
+        if not await lease.renew():
+            self._tasks.pop(broadcast_id, None)
+            return
+        keeper = asyncio.create_task(lease.keep_alive())
+        try:
+            await self._send_all(bot, broadcast_id, lease)
+        finally:
+            self._tasks.pop(broadcast_id, None)
+            keeper.cancel()
+            await lease.release()
+
+    async def _send_all(self, bot: Bot, broadcast_id: int, lease: Lease):
+        # Счётчики и курсор читаются после получения аренды: это последний чекпоинт
+        async with async_session() as session:
+            broadcast = await session.get(Broadcast, broadcast_id)
+        if broadcast is None or broadcast.status != 'running':
+            return
+        if broadcast.last_user_id:
+            logger.info(f"Продолжаем рассылку {broadcast_id} с user_id > {broadcast.last_user_id}")
+        progress = self.progress[broadcast_id] = BroadcastProgress(broadcast)
+        cursor = broadcast.last_user_id
+        text = broadcast.text
+
+        while True:
+            async with async_session() as session:
+                result = await session.scalars(
+                    select(User.user_id)
+                    .where(User.user_id > cursor, _not_blocked())
+                    .order_by(User.user_id)
+                    .limit(self.page_size)
+                )
+                user_ids = result.all()
+            if not user_ids:
+                break
+
+            results = await asyncio.gather(*[self._send(bot, user_id, text) for user_id in user_ids])
+            blocked = [user_id for user_id, status in zip(user_ids, results) if status == BLOCKED]
+            progress.sent += results.count(SENT)
+            progress.failed += results.count(FAILED)
+            progress.blocked += len(blocked)
+            cursor = user_ids[-1]
+            if not await self._checkpoint(broadcast_id, cursor, progress, blocked):
+                # Отменена (возможно, из другого процесса)
+                progress.finished = True
+                return
+            if not lease.held:
+                # Аренду забрал другой экземпляр: он продолжит с этого чекпоинта
+                return
+
+        async def write(session):
+            await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id, Broadcast.status == 'running')
+                .values(status='done', finished_at=datetime.utcnow())
+            )
+
+        await run_write(write)
+        progress.finished = True
+        logger.info(f"Рассылка {broadcast_id} завершена: {progress.snapshot()}")
+
+    async def _send(self, bot: Bot, user_id: int, text: str) -> str:
+        await self.pacer.wait(user_id)
+        while True:
+            await telegram_limiter.acquire()
+            try:
+                await bot.send_message(user_id, text, parse_mode="HTML")
+                return SENT
+            except TelegramRetryAfter as e:
+                # 429: притормозить все отправки бота, а не только эту
+                telegram_limiter.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return BLOCKED
+            except TelegramBadRequest:
+                return FAILED
+            except Exception as e:
+                logger.warning(f"Рассылка: ошибка отправки {user_id}: {e}")
+                return FAILED
+
+    async def _checkpoint(self, broadcast_id: int, cursor: int, progress: BroadcastProgress, blocked: List[int]) -> bool:
+        """Курсор, счётчики и заблокировавшие бота — одной транзакцией
+
+        Возвращает False, если рассылка больше не в статусе running.
+        """
+        async def write(session) -> int:
+            result = await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id, Broadcast.status == 'running')
+                .values(
+                    last_user_id=cursor,
+                    sent=progress.sent,
+                    failed=progress.failed,
+                    blocked=progress.blocked
+                )
+            )
+            if blocked:
+                await session.execute(
+                    update(User).where(User.user_id.in_(blocked)).values(is_blocked=True)
+                )
+            return result.rowcount
+
+        return await run_write(write) > 0
+
+
+def _not_blocked():
+    return or_(User.is_blocked == False, User.is_blocked.is_(None))
+
+
+broadcast_engine = BroadcastEngine()
@@ -0,0 +1,112 @@
+"""
+Предохранитель (circuit breaker) для отправки в одну рекламную сеть
+"""
+import logging
+import time
+from collections import deque
+from typing import Deque, Tuple
+
+from app.config import (
+    BREAKER_WINDOW,
+    BREAKER_MIN_REQUESTS,
+    BREAKER_ERROR_RATE,
+    BREAKER_SLOW_P95,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_CALLS
+)
+from app.services.health import percentile
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Три состояния: closed -> open -> half_open -> closed
+
+    В closed учитываются последние `window` запросов. Если их набралось
+    не меньше `min_requests` и доля ошибок достигла `error_rate` или p95
+    задержки превысил `slow_p95` секунд, предохранитель размыкается:
+    `open_seconds` запросы в сеть не идут вовсе. Затем пропускается
+    до `half_open_calls` пробных запросов; все успешные и быстрые —
+    замыкание, любой неудачный — снова open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = BREAKER_WINDOW,
+        min_requests: int = BREAKER_MIN_REQUESTS,
+        error_rate: float = BREAKER_ERROR_RATE,
+        slow_p95: float = BREAKER_SLOW_P95,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_calls: int = BREAKER_HALF_OPEN_CALLS
+    ):
+        self.name = name
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_p95 = slow_p95
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+    def allow(self) -> bool:
+        """Можно ли сейчас отправить запрос"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+            logger.info(f"Предохранитель {self.name}: half-open")
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                return False
+            self._probes += 1
+        return True
+
+    @property
+    def retry_in(self) -> float:
+        """Через сколько секунд предохранитель пропустит пробный запрос (0 — уже)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def record(self, success: bool, latency: float):
+        """Учесть результат запроса, пропущенного через allow()"""
+        if self.state == HALF_OPEN:
+            if not success or latency > self.slow_p95:
+                self._open('пробный запрос неудачен')
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self.state = CLOSED
+                self._outcomes.clear()
+                logger.info(f"Предохранитель {self.name}: closed")
+            return
+        if self.state == OPEN:
+            # Ответ на запрос, начатый до размыкания
+            return
+
+        self._outcomes.append((success, latency))
+        if len(self._outcomes) < self.min_requests:
+            return
+        failures = sum(1 for ok, _ in self._outcomes if not ok)
+        rate = failures / len(self._outcomes)
+        p95 = percentile([latency for _, latency in self._outcomes], 0.95)
+        if rate >= self.error_rate:
+            self._open(f"ошибок {rate:.0%}")
+        elif p95 > self.slow_p95:
+            self._open(f"p95 {p95:.2f} с")
+
+    def _open(self, reason: str):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        logger.warning(f"Предохранитель {self.name}: open ({reason})")
@@ -0,0 +1,102 @@
+"""
+Пакетирование конверсий для сетей, принимающих несколько событий за запрос
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+from app.config import POSTBACK_BATCH_SIZE, POSTBACK_BATCH_MAX_AGE
+from app.services.postback_adapters import NetworkAdapter
+
+# (adapter, buyer, config, leads) -> итоговый статус пакета
+BatchSender = Callable[[NetworkAdapter, object, object, List[dict]], Awaitable[str]]
+
+
+class _PendingBatch:
+    """Накапливаемый пакет одной сети одного конфига байера"""
+
+    __slots__ = ('adapter', 'buyer', 'config', 'items', 'timer')
+
+    def __init__(self, adapter: NetworkAdapter, buyer, config):
+        self.adapter = adapter
+        self.buyer = buyer
+        self.config = config
+        self.items: List[Tuple[dict, asyncio.Future]] = []
+        self.timer = None
+
+
+class ConversionBatcher:
+    """Группирует конверсии по (сеть, BuyerPixelConfig) и отправляет пакетами
+
+    Пакет уходит, когда набралось `max_size` событий (но не больше лимита
+    сети) или прошло `max_age` секунд с первого события. Каждый вызов
+    `submit` ждёт результата своего пакета и получает статус своего лида.
+    """
+
+    def __init__(
+        self,
+        send: BatchSender,
+        max_size: int = POSTBACK_BATCH_SIZE,
+        max_age: float = POSTBACK_BATCH_MAX_AGE
+    ):
+        self._send = send
+        self.max_size = max_size
+        self.max_age = max_age
+        self._pending: Dict[tuple, _PendingBatch] = {}
+        self._in_flight: Set[asyncio.Task] = set()
+
+        # Метрики
+        self.batches_sent = 0
+        self.events_sent = 0
+
+    async def submit(self, adapter: NetworkAdapter, buyer, config, lead: dict) -> str:
+        """Добавить лид в пакет и дождаться статуса его отправки"""
+        key = (adapter.name, config.id if config is not None else f"buyer:{buyer.id}")
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(adapter, buyer, config)
+            batch.timer = asyncio.get_running_loop().call_later(self.max_age, self._flush, key)
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append((lead, future))
+        if len(batch.items) >= min(self.max_size, adapter.max_batch_size):
+            self._flush(key)
+        return await future
+
+    async def flush_all(self):
+        """Отправить все накопленные пакеты и дождаться их"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Метрики пакетирования"""
+        return {
+            'pending_events': sum(len(batch.items) for batch in self._pending.values()),
+            'batches_sent': self.batches_sent,
+            'events_sent': self.events_sent,
+            'avg_batch_size': round(self.events_sent / self.batches_sent, 1) if self.batches_sent else 0.0
+        }
+
+    def _flush(self, key: tuple):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.create_task(self._send_batch(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send_batch(self, batch: _PendingBatch):
+        leads = [lead for lead, _ in batch.items]
+        try:
+            status = await self._send(batch.adapter, batch.buyer, batch.config, leads)
+        except Exception as e:
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches_sent += 1
+        self.events_sent += len(leads)
+        for _, future in batch.items:
+            if not future.done():
+                future.set_result(status)
@@ -1,8 +1,218 @@
 """
 Сервис отправки конверсий в рекламные сети
 """
-# Временная заглушка
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from app.config import (
+    POSTBACK_CONCURRENCY,
+    POSTBACK_TIMEOUT,
+    POSTBACK_RETRY_BASE_DELAY
+)
+from app.cache.buyers import buyers
+from app.database.models import Application, async_session
+from app.database.queries import log_postbacks
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.conversion_batcher import ConversionBatcher
+from app.services.health import postback_health
+from app.services.postback_adapters import NetworkAdapter, build_adapters, lead_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Значения по умолчанию из BuyerPixelConfig, если конфигурации у байера нет
+DEFAULT_RETRY_FAILED = True
+DEFAULT_MAX_RETRIES = 3
+
+
 class ConversionSender:
-    @classmethod
-    async def send_conversion(cls, application_id: int):
-        return {"status": "pending"}
+    """Доставка конверсий во все настроенные у байера сети
+
+    Вызывается из обработчика событий outbox (`deliver`), HTTP-запросы
+    идут через общий пул соединений aiohttp. Одновременных
+    запросов не больше `concurrency`, каждый ограничен `timeout`.
+    Неудачные попытки повторяются с экспоненциальной задержкой
+    согласно `retry_failed`/`max_retries`, каждая попытка пишется в PostbackLog.
+    Сети, принимающие несколько событий за запрос (Facebook CAPI),
+    получают конверсии пакетами через ConversionBatcher.
+    У каждой сети свой предохранитель: пока он разомкнут, запросы в сеть
+    не идут и не занимают соединения, а попытка пишется со статусом 'rejected';
+    такую конверсию outbox повторит после `retry_in`.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = POSTBACK_CONCURRENCY,
+        timeout: float = POSTBACK_TIMEOUT,
+        retry_base_delay: float = POSTBACK_RETRY_BASE_DELAY,
+        endpoints: Optional[Dict[str, str]] = None
+    ):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retry_base_delay = retry_base_delay
+        self.adapters: List[NetworkAdapter] = build_adapters(endpoints)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._http: Optional[aiohttp.ClientSession] = None
+        self.batcher = ConversionBatcher(self._deliver_to)
+
+        # Метрики
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Открыть пул соединений"""
+        if self._http is None:
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+            )
+
+    async def stop(self):
+        """Отправить накопленные пакеты и закрыть пул"""
+        await self.batcher.flush_all()
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def stats(self) -> dict:
+        """Метрики отправки"""
+        return {
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'batching': self.batcher.stats(),
+            'breakers': {name: breaker.state for name, breaker in self.breakers.items()}
+        }
+
+    def retry_in(self, networks: Iterable[str]) -> float:
+        """Через сколько секунд предохранители этих сетей пропустят запрос"""
+        networks = set(networks)
+        return max(
+            (breaker.retry_in for key, breaker in self.breakers.items() if key.split(':', 1)[0] in networks),
+            default=0.0
+        )
+
+    async def deliver(
+        self,
+        application_id: int,
+        buyer_id: int,
+        click_id: Optional[str] = None,
+        skip: Iterable[str] = ()
+    ) -> Dict[str, str]:
+        """Отправить конверсию в сети байера, кроме `skip`, и вернуть {сеть: статус}"""
+        async with async_session() as session:
+            application = await session.get(Application, application_id)
+        buyer = await buyers.get_by_id(buyer_id)
+        if application is None or buyer is None or not buyer.is_active:
+            return {}
+
+        config = buyer.pixel_config
+        lead = {
+            'application_id': application.id,
+            'user_id': application.user_id,
+            'phone': application.phone,
+            'country': application.country,
+            'created_at': lead_timestamp(application.created_at),
+            'click_id': click_id
+        }
+        skip = set(skip)
+        adapters = [
+            adapter for adapter in self.adapters
+            if adapter.name not in skip and adapter.can_send(buyer, config, lead)
+        ]
+        results = await asyncio.gather(*[
+            self.batcher.submit(adapter, buyer, config, lead)
+            if adapter.max_batch_size > 1
+            else self._deliver_to(adapter, buyer, config, [lead])
+            for adapter in adapters
+        ])
+        return {adapter.name: status for adapter, status in zip(adapters, results)}
+
+    async def _deliver_to(self, adapter: NetworkAdapter, buyer, config, leads: List[dict]) -> str:
+        """Отправка лидов в одну сеть (одним запросом) с повторами; возвращает итоговый статус"""
+        retry_failed = config.retry_failed if config is not None else DEFAULT_RETRY_FAILED
+        max_retries = config.max_retries if config is not None and config.max_retries is not None else DEFAULT_MAX_RETRIES
+        attempts = 1 + (max_retries if retry_failed else 0)
+        if len(leads) == 1:
+            request = adapter.build_request(buyer, config, leads[0])
+        else:
+            request = adapter.build_batch_request(buyer, config, leads)
+
+        breaker = self._breaker(adapter, request.url)
+
+        for attempt in range(1, attempts + 1):
+            response_code = None
+            if not breaker.allow():
+                # Сеть отключена предохранителем — не ждём её и не повторяем
+                await self._log(adapter, buyer, leads, 'rejected', None, 'circuit open', attempt)
+                postback_health.record_rejected(adapter.name, buyer.buyer_code, len(leads))
+                self.rejected += len(leads)
+                return 'rejected'
+
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    async with self._http.request(
+                        request.method, request.url, params=request.params, json=request.json
+                    ) as response:
+                        response_code = response.status
+                        response_text = await response.text()
+                success = adapter.is_success(response_code, response_text)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                success = False
+                response_text = f"{type(e).__name__}: {e}"
+            latency = time.perf_counter() - started
+            # 4xx — ошибка в данных лида или настройках байера, а не отказ сети
+            network_ok = success or (response_code is not None and 400 <= response_code < 500 and response_code != 429)
+            breaker.record(network_ok, latency)
+            postback_health.record(adapter.name, buyer.buyer_code, success, latency, len(leads))
+
+            # Ошибки клиента (кроме 429) повторять бессмысленно
+            retryable = response_code is None or response_code == 429 or response_code >= 500
+            final = success or not retryable or attempt == attempts
+            status = 'success' if success else ('failed' if final else 'retry')
+            await self._log(adapter, buyer, leads, status, response_code, response_text, attempt)
+            if final:
+                if success:
+                    self.succeeded += len(leads)
+                else:
+                    self.failed += len(leads)
+                return status
+
+            delay = self.retry_base_delay * 2 ** (attempt - 1)
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+        return 'failed'
+
+    def _breaker(self, adapter: NetworkAdapter, url: str) -> CircuitBreaker:
+        """Предохранитель сети; для postback-URL байеров — отдельный на каждый хост"""
+        key = f"{adapter.name}:{urlsplit(url).netloc}"
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(key)
+        return breaker
+
+    async def _log(self, adapter: NetworkAdapter, buyer, leads: List[dict], status: str,
+                   response_code: Optional[int], response_text: str, attempt: int):
+        """Результат пакета раскладывается на каждый лид отдельной записью лога"""
+        await log_postbacks([
+            {
+                'buyer_id': buyer.id,
+                'application_id': lead['application_id'],
+                'network': adapter.name,
+                'status': status,
+                'response_code': response_code,
+                'response_text': response_text[:1000],
+                'attempt': attempt
+            }
+            for lead in leads
+        ])
+
+
+conversion_sender = ConversionSender()
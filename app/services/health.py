@@ -0,0 +1,77 @@
+"""
+Реестр здоровья отправки конверсий: счётчики и задержки по сетям и байерам
+"""
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+def percentile(samples, q: float) -> float:
+    """Перцентиль q (0..1) по методу ближайшего ранга"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class EndpointHealth:
+    """Счётчики одной сети или байера + задержки последних запросов"""
+
+    __slots__ = ('succeeded', 'failed', 'rejected', 'latencies')
+
+    def __init__(self, window: int):
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def snapshot(self) -> dict:
+        return {
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'p50_ms': round(percentile(self.latencies, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(self.latencies, 0.95) * 1000, 1)
+        }
+
+
+class HealthRegistry:
+    """Метрики по сети (`adapter.name`) и по байеру (`Buyer.buyer_code`)
+
+    Задержки хранятся для последних `window` запросов каждого ключа,
+    перцентили считаются при запросе снимка.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.networks: Dict[str, EndpointHealth] = {}
+        self.buyers: Dict[str, EndpointHealth] = {}
+
+    def _entries(self, network: str, buyer_code: Optional[str]):
+        yield self.networks.setdefault(network, EndpointHealth(self.window))
+        if buyer_code:
+            yield self.buyers.setdefault(buyer_code, EndpointHealth(self.window))
+
+    def record(self, network: str, buyer_code: Optional[str], success: bool, latency: float, events: int = 1):
+        """Учесть завершённый запрос (events — число лидов в запросе)"""
+        for entry in self._entries(network, buyer_code):
+            if success:
+                entry.succeeded += events
+            else:
+                entry.failed += events
+            entry.latencies.append(latency)
+
+    def record_rejected(self, network: str, buyer_code: Optional[str], events: int = 1):
+        """Учесть попытку, отклонённую предохранителем без запроса в сеть"""
+        for entry in self._entries(network, buyer_code):
+            entry.rejected += events
+
+    def snapshot(self) -> dict:
+        """Текущие метрики {'networks': {...}, 'buyers': {...}}"""
+        return {
+            'networks': {name: entry.snapshot() for name, entry in self.networks.items()},
+            'buyers': {code: entry.snapshot() for code, entry in self.buyers.items()}
+        }
+
+
+postback_health = HealthRegistry()
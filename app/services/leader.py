@@ -0,0 +1,146 @@
+"""
+Выбор лидера для фоновых задач через аренду в таблице `job_leases`
+
+Экземпляр, который держит аренду, продлевает её каждые `heartbeat`
+секунд. Если он упал или потерял связь с БД, аренда истекает через
+`ttl` секунд и её забирает другой экземпляр. Свою аренду держатель
+считает действующей только до `ttl - heartbeat` секунд после последнего
+успешного продления, чтобы остановить задачи раньше, чем их подхватит
+другой. Часы экземпляров должны расходиться меньше чем на `heartbeat`.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.config import LEADER_LEASE_SECONDS, LEADER_HEARTBEAT_SECONDS
+from app.database.queries import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+# Держатель аренд этого процесса
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Lease:
+    """Аренда с именем `name` в job_leases"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = LEADER_LEASE_SECONDS,
+        heartbeat: float = LEADER_HEARTBEAT_SECONDS,
+        holder: str = INSTANCE_ID
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.holder = holder
+        self._renewed_at: Optional[float] = None
+
+    @property
+    def held(self) -> bool:
+        """Держим ли аренду с запасом до её истечения"""
+        return (
+            self._renewed_at is not None
+            and time.monotonic() - self._renewed_at < self.ttl - self.heartbeat
+        )
+
+    async def renew(self) -> bool:
+        """Взять или продлить аренду; ошибка БД не отнимает её до истечения запаса"""
+        started = time.monotonic()
+        try:
+            acquired = await acquire_lease(self.name, self.holder, self.ttl)
+        except Exception as e:
+            logger.warning(f"Аренда {self.name}: не удалось продлить: {e}")
+            return self.held
+        self._renewed_at = started if acquired else None
+        return acquired
+
+    async def keep_alive(self):
+        """Продлевать аренду, пока она держится; вернуться, когда она потеряна"""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if not await self.renew():
+                logger.warning(f"Аренда {self.name} потеряна")
+                return
+
+    async def release(self):
+        """Отпустить аренду (при остановке), чтобы её сразу взял другой"""
+        if self._renewed_at is None:
+            return
+        self._renewed_at = None
+        try:
+            await release_lease(self.name, self.holder)
+        except Exception as e:
+            logger.warning(f"Аренда {self.name}: не удалось отпустить: {e}")
+
+
+class LeaderElection:
+    """Запускает задачи лидера, пока этот процесс держит аренду `leader`
+
+    `on_elected` вызывается при получении аренды, `on_demoted` — при
+    потере и при остановке.
+    """
+
+    def __init__(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+        lease: Optional[Lease] = None
+    ):
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lease = lease or Lease('leader')
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.elections = 0
+
+    def start(self):
+        """Запустить участие в выборах"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить задачи лидера и отпустить аренду"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            await self._demote()
+        await self.lease.release()
+
+    def stats(self) -> dict:
+        """Состояние выборов"""
+        return {'holder': self.lease.holder, 'is_leader': self.is_leader, 'elections': self.elections}
+
+    async def _run(self):
+        while True:
+            held = await self.lease.renew()
+            if held and not self.is_leader:
+                self.is_leader = True
+                self.elections += 1
+                logger.info(f"{self.lease.holder} стал лидером: запускаем фоновые задачи")
+                try:
+                    await self.on_elected()
+                except Exception as e:
+                    logger.error(f"Ошибка запуска задач лидера: {e}")
+            elif not held and self.is_leader:
+                logger.warning(f"{self.lease.holder} больше не лидер: останавливаем фоновые задачи")
+                await self._demote()
+            await asyncio.sleep(self.lease.heartbeat)
+
+    async def _demote(self):
+        self.is_leader = False
+        try:
+            await self.on_demoted()
+        except Exception as e:
+            logger.error(f"Ошибка остановки задач лидера: {e}")
@@ -0,0 +1,261 @@
+"""
+Воркеры transactional outbox
+
+События пишутся в таблицу `outbox` в той же транзакции, что и данные
+(см. `create_application`), поэтому не теряются при падении процесса.
+Воркеры забирают их пачками под аренду (`locked_until`): на PostgreSQL
+строки выбираются через FOR UPDATE SKIP LOCKED, на SQLite достаточно
+атомарного UPDATE ... WHERE id IN (...). Если воркер умер, аренда
+истекает и событие берёт другой — доставка "хотя бы один раз".
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, update, and_, or_
+
+from app.config import (
+    OUTBOX_WORKERS,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_MAX_ATTEMPTS
+)
+from app.database.models import OutboxEvent
+from app.database.sqlite_writer import run_write
+from app.services.conversion_sender import conversion_sender
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+# Обработчики по типу события
+HANDLERS: Dict[str, EventHandler] = {}
+
+
+def register_handler(event_type: str, handler: EventHandler):
+    """Зарегистрировать обработчик типа события"""
+    HANDLERS[event_type] = handler
+
+
+class RetryLater(Exception):
+    """Обработчик просит повторить событие через `delay` секунд
+
+    `payload` заменяет сохранённый (например, с отметкой уже сделанного).
+    `count_attempt=False` — попытка не расходует max_attempts (например,
+    сеть временно отключена предохранителем и запрос не отправлялся).
+    """
+
+    def __init__(
+        self,
+        message: str,
+        delay: Optional[float] = None,
+        payload: Optional[dict] = None,
+        count_attempt: bool = True
+    ):
+        super().__init__(message)
+        self.delay = delay
+        self.payload = payload
+        self.count_attempt = count_attempt
+
+
+class OutboxProcessor:
+    """Пул воркеров, разбирающих outbox"""
+
+    def __init__(
+        self,
+        workers: int = OUTBOX_WORKERS,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        lease_seconds: int = OUTBOX_LEASE_SECONDS,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+
+        # Метрики
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self._started_at: Optional[float] = None
+
+    def start(self):
+        """Запустить воркеры"""
+        if not self._tasks:
+            self._started_at = time.monotonic()
+            self._tasks = [
+                asyncio.create_task(self._worker(f"{self.instance_id}:{n}"))
+                for n in range(self.workers)
+            ]
+
+    async def stop(self):
+        """Остановить воркеры; незавершённые события вернутся по истечении аренды"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        """Метрики обработки"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        return {
+            'processed': self.processed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'throughput_per_sec': round(self.processed / elapsed, 2) if elapsed else 0.0
+        }
+
+    async def _worker(self, worker_id: str):
+        while True:
+            try:
+                events = await self.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Ошибка выборки outbox: {e}")
+                events = []
+            if not events:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await asyncio.gather(*[self._process(event) for event in events])
+
+    async def claim(self, worker_id: str) -> List[dict]:
+        """Взять пачку доступных событий в аренду"""
+        now = datetime.utcnow()
+
+        async def write(session) -> List[dict]:
+            candidates = (
+                select(OutboxEvent.id)
+                .where(
+                    and_(
+                        OutboxEvent.status == 'pending',
+                        OutboxEvent.available_at <= now,
+                        or_(OutboxEvent.locked_until.is_(None), OutboxEvent.locked_until < now)
+                    )
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )
+            if session.bind.dialect.name == 'postgresql':
+                candidates = candidates.with_for_update(skip_locked=True)
+            result = await session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(candidates))
+                .values(
+                    locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=self.lease_seconds),
+                    attempts=OutboxEvent.attempts + 1
+                )
+                .returning(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload, OutboxEvent.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            return [
+                {'id': row.id, 'event_type': row.event_type, 'payload': json.loads(row.payload), 'attempts': row.attempts}
+                for row in result
+            ]
+
+        return await run_write(write)
+
+    async def _process(self, event: dict):
+        handler = HANDLERS.get(event['event_type'])
+        try:
+            if handler is None:
+                raise LookupError(f"Нет обработчика для {event['event_type']}")
+            await handler(event['payload'])
+        except Exception as e:
+            await self._fail(event, e)
+            return
+        await self._finish(event['id'], status='done')
+        self.processed += 1
+
+    async def _fail(self, event: dict, error: Exception):
+        retry = error if isinstance(error, RetryLater) else None
+        counted = retry is None or retry.count_attempt
+        if counted and event['attempts'] >= self.max_attempts:
+            logger.error(f"Событие outbox {event['id']} отброшено после {event['attempts']} попыток: {error}")
+            await self._finish(event['id'], status='failed', error=error)
+            self.failed += 1
+            return
+        # Повтор с экспоненциальной задержкой, не дольше часа
+        delay = min(2 ** event['attempts'], 3600)
+        if retry is not None and retry.delay is not None:
+            delay = retry.delay
+        values = {
+            'available_at': datetime.utcnow() + timedelta(seconds=delay),
+            'locked_by': None,
+            'locked_until': None,
+            'last_error': str(error)[:1000]
+        }
+        if retry is not None and retry.payload is not None:
+            values['payload'] = json.dumps(retry.payload)
+        if not counted:
+            # claim уже увеличил attempts
+            values['attempts'] = OutboxEvent.attempts - 1
+
+        async def write(session):
+            await session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id == event['id'])
+                .values(**values)
+            )
+
+        await run_write(write)
+        self.retried += 1
+
+    async def _finish(self, event_id: int, status: str, error: Optional[Exception] = None):
+        async def write(session):
+            await session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id == event_id)
+                .values(
+                    status=status,
+                    processed_at=datetime.utcnow(),
+                    locked_by=None,
+                    locked_until=None,
+                    last_error=str(error)[:1000] if error else None
+                )
+            )
+
+        await run_write(write)
+
+
+async def deliver_conversion(payload: dict):
+    """Отправка конверсии; повторы по сетям делает сам ConversionSender
+
+    Если какая-то сеть не приняла конверсию, событие повторяется через
+    outbox, а сети, уже получившие её, записываются в payload['delivered']
+    и в повторе пропускаются. Если сеть только отключена предохранителем,
+    событие откладывается до его пробного запроса и попытка не расходуется.
+    """
+    delivered = list(payload.get('delivered', []))
+    statuses = await conversion_sender.deliver(
+        payload['application_id'], payload['buyer_id'], payload.get('click_id'), skip=delivered
+    )
+    delivered += [network for network, status in statuses.items() if status == 'success']
+    failed = [network for network, status in statuses.items() if status == 'failed']
+    rejected = [network for network, status in statuses.items() if status == 'rejected']
+    if failed:
+        raise RetryLater(
+            f"Сети не приняли конверсию: {', '.join(failed + rejected)}",
+            payload={**payload, 'delivered': delivered}
+        )
+    if rejected:
+        raise RetryLater(
+            f"Предохранитель разомкнут: {', '.join(rejected)}",
+            delay=max(1.0, conversion_sender.retry_in(rejected)),
+            payload={**payload, 'delivered': delivered},
+            count_attempt=False
+        )
+
+
+register_handler('conversion', deliver_conversion)
+
+outbox_processor = OutboxProcessor()
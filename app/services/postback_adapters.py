@@ -0,0 +1,278 @@
+"""
+Адаптеры рекламных сетей для отправки конверсий
+
+Каждый адаптер по настройкам байера (`Buyer` + `BuyerPixelConfig`)
+и данным лида собирает HTTP-запрос. URL сетей заданы шаблонами
+`endpoint` и могут быть переопределены (например, на локальную заглушку).
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import quote
+
+
+class PostbackRequest(NamedTuple):
+    """HTTP-запрос конверсии"""
+    method: str
+    url: str
+    params: Optional[dict] = None
+    json: Optional[dict] = None
+
+
+def sha256(value: str) -> str:
+    """Хеш для персональных данных (требование Facebook CAPI)"""
+    return hashlib.sha256(value.strip().lower().encode()).hexdigest()
+
+
+class NetworkAdapter:
+    """Базовый адаптер сети"""
+
+    name = 'base'
+    endpoint = ''
+    # Нужен ли click id из рекламной ссылки
+    requires_click_id = False
+    # Сколько событий сеть принимает одним запросом (1 — пакетов нет)
+    max_batch_size = 1
+
+    def __init__(self, endpoint: Optional[str] = None):
+        if endpoint:
+            self.endpoint = endpoint
+
+    def is_configured(self, buyer, config) -> bool:
+        """Заполнены ли у байера настройки этой сети"""
+        raise NotImplementedError
+
+    def can_send(self, buyer, config, lead: dict) -> bool:
+        if not self.is_configured(buyer, config):
+            return False
+        return bool(lead.get('click_id')) or not self.requires_click_id
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        raise NotImplementedError
+
+    def build_batch_request(self, buyer, config, leads: List[dict]) -> PostbackRequest:
+        """Запрос сразу на несколько лидов (для сетей с max_batch_size > 1)"""
+        raise NotImplementedError
+
+    def is_success(self, status: int, body: str) -> bool:
+        return 200 <= status < 300
+
+
+class FacebookAdapter(NetworkAdapter):
+    """Facebook Conversions API"""
+
+    name = 'facebook'
+    endpoint = 'https://graph.facebook.com/v18.0/{pixel_id}/events'
+    # Лимит CAPI — 1000 событий в запросе
+    max_batch_size = 1000
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.fb_pixel_id and config.fb_access_token)
+
+    def build_event(self, lead: dict) -> dict:
+        """Событие Lead в формате CAPI"""
+        user_data = {
+            'ph': [sha256(''.join(ch for ch in lead['phone'] if ch.isdigit()))],
+            'external_id': [sha256(str(lead['user_id']))]
+        }
+        if lead.get('click_id'):
+            user_data['fbc'] = f"fb.1.{int(lead['created_at'] * 1000)}.{lead['click_id']}"
+        return {
+            'event_name': 'Lead',
+            'event_time': int(lead['created_at']),
+            # event_id совпадает при повторной отправке — Facebook дедуплицирует
+            'event_id': f"lead_{lead['application_id']}",
+            'action_source': 'chat',
+            'user_data': user_data
+        }
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        return self.build_batch_request(buyer, config, [lead])
+
+    def build_batch_request(self, buyer, config, leads: List[dict]) -> PostbackRequest:
+        payload = {'data': [self.build_event(lead) for lead in leads]}
+        if config.send_test_events and config.fb_test_event_code:
+            payload['test_event_code'] = config.fb_test_event_code
+        return PostbackRequest(
+            'POST',
+            self.endpoint.format(pixel_id=config.fb_pixel_id),
+            params={'access_token': config.fb_access_token},
+            json=payload
+        )
+
+
+class GoogleAdsAdapter(NetworkAdapter):
+    """Google Ads: пиксельный эндпоинт конверсии по gclid"""
+
+    name = 'google'
+    endpoint = 'https://www.googleadservices.com/pagead/conversion/{conversion_id}/'
+    requires_click_id = True
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.google_conversion_id and config.google_conversion_label)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        return PostbackRequest(
+            'GET',
+            self.endpoint.format(conversion_id=config.google_conversion_id),
+            params={
+                'label': config.google_conversion_label,
+                'gclid': lead['click_id'],
+                'oid': str(lead['application_id'])
+            }
+        )
+
+
+class TelegramAdapter(NetworkAdapter):
+    """Уведомление байеру о лиде через его Telegram-бота"""
+
+    name = 'telegram'
+    endpoint = 'https://api.telegram.org/bot{token}/sendMessage'
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.telegram_token and buyer.telegram_id)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        return PostbackRequest(
+            'POST',
+            self.endpoint.format(token=config.telegram_token),
+            json={
+                'chat_id': buyer.telegram_id,
+                'text': f"🆕 Лид #{lead['application_id']} ({lead['country']})"
+            }
+        )
+
+
+class PropellerAdsAdapter(NetworkAdapter):
+    """PropellerAds S2S postback"""
+
+    name = 'propeller'
+    endpoint = 'https://ad.propellerads.com/conversion.php'
+    requires_click_id = True
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.propeller_auth_token and config.propeller_offer_id)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        return PostbackRequest(
+            'GET',
+            self.endpoint,
+            params={
+                'aid': config.propeller_auth_token,
+                'pid': '',
+                'tid': config.propeller_offer_id,
+                'visitor_id': lead['click_id']
+            }
+        )
+
+
+class RichAdsAdapter(NetworkAdapter):
+    """RichAds S2S postback"""
+
+    name = 'richads'
+    endpoint = 'https://xml.richads.com/api/conversion'
+    requires_click_id = True
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.richads_campaign_id and config.richads_auth_token)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        return PostbackRequest(
+            'GET',
+            self.endpoint,
+            params={
+                'key': config.richads_auth_token,
+                'campaign_id': config.richads_campaign_id,
+                'click_id': lead['click_id']
+            }
+        )
+
+
+class EvaDavAdapter(NetworkAdapter):
+    """EvaDav: постбэк-URL из настроек байера с подстановкой {click_id}"""
+
+    name = 'evadav'
+    requires_click_id = True
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.evadav_postback_url)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        url = self.endpoint or config.evadav_postback_url
+        return PostbackRequest('GET', url.replace('{click_id}', quote(lead['click_id'])))
+
+
+class PushHouseAdapter(NetworkAdapter):
+    """PushHouse S2S postback"""
+
+    name = 'pushhouse'
+    endpoint = 'https://pushhouse.io/api/conversion'
+    requires_click_id = True
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.pushhouse_source_id)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        params = {'source_id': config.pushhouse_source_id, 'click_id': lead['click_id']}
+        if config.pushhouse_external_id:
+            params['external_id'] = config.pushhouse_external_id
+        return PostbackRequest('GET', self.endpoint, params=params)
+
+
+class OnClickAdapter(NetworkAdapter):
+    """OnClick S2S postback"""
+
+    name = 'onclick'
+    endpoint = 'https://onclckmn.com/api/conversion'
+    requires_click_id = True
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(config and config.onclick_campaign_uuid)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        params = {'campaign_uuid': config.onclick_campaign_uuid, 'click_id': lead['click_id']}
+        if config.onclick_source_id:
+            params['source_id'] = config.onclick_source_id
+        return PostbackRequest('GET', self.endpoint, params=params)
+
+
+class GenericPostbackAdapter(NetworkAdapter):
+    """Произвольный `Buyer.postback_url` с подстановками {click_id}, {application_id}, {user_id}"""
+
+    name = 'postback'
+
+    def is_configured(self, buyer, config) -> bool:
+        return bool(buyer.postback_url)
+
+    def build_request(self, buyer, config, lead: dict) -> PostbackRequest:
+        url = self.endpoint or buyer.postback_url
+        for key in ('click_id', 'application_id', 'user_id'):
+            url = url.replace('{' + key + '}', quote(str(lead.get(key) or '')))
+        return PostbackRequest('GET', url)
+
+
+ADAPTER_CLASSES = [
+    FacebookAdapter,
+    GoogleAdsAdapter,
+    TelegramAdapter,
+    PropellerAdsAdapter,
+    RichAdsAdapter,
+    EvaDavAdapter,
+    PushHouseAdapter,
+    OnClickAdapter,
+    GenericPostbackAdapter,
+]
+
+
+def build_adapters(endpoints: Optional[Dict[str, str]] = None) -> List[NetworkAdapter]:
+    """Адаптеры всех сетей; `endpoints` переопределяет URL по имени сети"""
+    endpoints = endpoints or {}
+    return [cls(endpoints.get(cls.name)) for cls in ADAPTER_CLASSES]
+
+
+def lead_timestamp(created_at: Optional[datetime]) -> float:
+    """Unix-время создания заявки (created_at хранится как наивное UTC)"""
+    if created_at is None:
+        return time.time()
+    return created_at.replace(tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,183 @@
+"""
+Шардирование апдейтов по процессам (WORKERS > 1)
+
+Процесс-маршрутизатор принимает апдейты (вебхук или long polling) и не
+обрабатывает их сам: каждый апдейт уходит одному из воркеров по
+`from.id % WORKERS`. Все апдейты пользователя попадают в один процесс,
+поэтому его FSM и кеш FSM остаются согласованными. Воркер — обычный бот
+со своим event loop, сессией БД и кешами; апдейты приходят ему по
+socketpair, по одному JSON на строку. Если воркер не успевает, буфер
+сокета заполняется и маршрутизатор ждёт (`drain`), а вместе с ним
+и Telegram.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import time
+from typing import Callable, List, Optional
+
+from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать выхода воркера после закрытия его канала, секунды
+WORKER_STOP_TIMEOUT = 60
+
+# Строка, которой воркер сообщает о готовности
+READY = b'ready\n'
+
+
+def shard_of(data: dict, shards: int) -> int:
+    """Номер воркера для апдейта: по from.id, иначе по chat.id, иначе по update_id"""
+    for value in data.values():
+        if isinstance(value, dict):
+            for field in ('from', 'user', 'chat'):
+                owner = value.get(field)
+                if isinstance(owner, dict) and 'id' in owner:
+                    return owner['id'] % shards
+    return data.get('update_id', 0) % shards
+
+
+class _Worker:
+    __slots__ = ('index', 'process', 'writer', 'ready', 'sent')
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        # Воркер поднял бота и прогрел кеши (прислал строку READY)
+        self.ready: Optional[asyncio.Task] = None
+        self.sent = 0
+
+
+class ShardRouter:
+    """Запуск воркеров и раздача им апдейтов
+
+    `target(index, sock)` выполняется в отдельном процессе (spawn) и должен
+    читать апдейты из `sock` (см. `serve_shard`). Упавший воркер
+    перезапускается; апдейты, которые он не успел обработать, теряются.
+    """
+
+    def __init__(self, workers: int, target: Callable[[int, socket.socket], None]):
+        self.target = target
+        self._context = multiprocessing.get_context('spawn')
+        self._workers: List[_Worker] = [_Worker(index) for index in range(workers)]
+        self._watchdog: Optional[asyncio.Task] = None
+        self.restarts = 0
+        self.started_at = time.monotonic()
+
+    async def start(self):
+        for worker in self._workers:
+            await self._spawn(worker)
+        self._watchdog = asyncio.create_task(self._watch())
+
+    async def submit(self, data: dict):
+        """Отправить апдейт воркеру его пользователя"""
+        if not isinstance(data, dict) or 'update_id' not in data:
+            raise ValueError("не апдейт Telegram")
+        worker = self._workers[shard_of(data, len(self._workers))]
+        worker.writer.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode() + b'\n')
+        worker.sent += 1
+        await worker.writer.drain()
+
+    @property
+    def ready(self) -> bool:
+        """Все воркеры запущены и готовы обрабатывать апдейты"""
+        return all(
+            worker.ready is not None and worker.ready.done() and not worker.ready.exception()
+            for worker in self._workers
+        )
+
+    async def drain(self):
+        for worker in self._workers:
+            await worker.writer.drain()
+
+    async def stop(self):
+        """Закрыть каналы и дождаться, пока воркеры доработают"""
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        for worker in self._workers:
+            worker.writer.close()
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            await loop.run_in_executor(None, worker.process.join, WORKER_STOP_TIMEOUT)
+            if worker.process.is_alive():
+                logger.warning(f"Воркер {worker.index} не остановился, завершаем")
+                worker.process.terminate()
+
+    def stats(self) -> dict:
+        """Метрики маршрутизации"""
+        elapsed = time.monotonic() - self.started_at
+        sent = sum(worker.sent for worker in self._workers)
+        return {
+            'workers': len(self._workers),
+            'ready': self.ready,
+            'routed': [worker.sent for worker in self._workers],
+            'restarts': self.restarts,
+            'per_sec': round(sent / elapsed, 1) if elapsed else 0.0
+        }
+
+    async def _spawn(self, worker: _Worker):
+        ours, theirs = socket.socketpair()
+        worker.process = self._context.Process(
+            target=self.target, args=(worker.index, theirs), name=f"bot-worker-{worker.index}"
+        )
+        worker.process.start()
+        theirs.close()
+        reader, worker.writer = await asyncio.open_connection(sock=ours)
+        worker.ready = asyncio.create_task(reader.readuntil(READY))
+        logger.info(f"Воркер {worker.index} запущен (pid {worker.process.pid})")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(1)
+            for worker in self._workers:
+                if not worker.process.is_alive():
+                    logger.error(f"Воркер {worker.index} завершился (код {worker.process.exitcode}), перезапуск")
+                    worker.writer.close()
+                    worker.ready.cancel()
+                    self.restarts += 1
+                    await self._spawn(worker)
+
+
+async def serve_shard(sock: socket.socket, sink):
+    """Цикл воркера: читать апдейты из канала до его закрытия
+
+    `sink` — UpdateDispatcher: `submit` ждёт свободного слота, поэтому
+    чтение из канала останавливается, пока воркер занят.
+    """
+    reader, writer = await asyncio.open_connection(sock=sock, limit=2 ** 20)
+    writer.write(READY)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                await sink.submit(json.loads(line))
+            except ValueError as e:
+                logger.warning(f"Воркер: некорректный апдейт: {e}")
+    finally:
+        await sink.drain()
+        writer.close()
+
+
+async def poll_updates(bot: Bot, sink, allowed_updates: Optional[List[str]] = None, timeout: int = 30):
+    """Long polling без диспетчера: апдейты сразу уходят в `sink`"""
+    offset = None
+    backoff = 1
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=timeout, allowed_updates=allowed_updates)
+        except Exception as e:
+            logger.error(f"Ошибка получения апдейтов: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+            continue
+        backoff = 1
+        for update in updates:
+            await sink.submit(update.model_dump(mode='json', by_alias=True, exclude_none=True))
+            offset = update.update_id + 1
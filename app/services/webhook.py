@@ -0,0 +1,183 @@
+"""
+Приём апдейтов по вебхуку (BOT_MODE=webhook)
+
+Telegram шлёт апдейты POST-запросами на WEBHOOK_PATH. Запрос сверяется
+с секретом из заголовка X-Telegram-Bot-Api-Secret-Token, апдейт
+отдаётся на обработку отдельной задачей, а Telegram сразу получает 200.
+Одновременно обрабатывается не больше `max_concurrency` апдейтов: когда
+все слоты заняты, ответ задерживается до освобождения слота, и Telegram
+сам притормаживает отправку (он держит не больше WEBHOOK_MAX_CONNECTIONS
+запросов без ответа).
+"""
+import asyncio
+import logging
+import signal
+import time
+from hmac import compare_digest
+from typing import List, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from app.config import (
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_MAX_CONNECTIONS
+)
+from app.database.pool import pool_metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class UpdateDispatcher:
+    """Обработка апдейтов задачами, не больше `max_concurrency` одновременно
+
+    `submit` ждёт свободного слота, поэтому источник апдейтов (вебхук
+    или канал от процесса-маршрутизатора) притормаживает сам.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, max_concurrency: int = WEBHOOK_MAX_CONCURRENCY):
+        self.dp = dp
+        self.bot = bot
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self.ready = True
+
+        # Метрики
+        self.processed = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+    async def submit(self, data: dict):
+        """Принять апдейт; ValidationError, если это не апдейт"""
+        update = Update.model_validate(data, context={'bot': self.bot})
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self, timeout: float = 30):
+        """Дождаться апдейтов, которые уже в обработке"""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    def stats(self) -> dict:
+        """Метрики обработки"""
+        elapsed = time.monotonic() - self.started_at
+        return {
+            'processed': self.processed,
+            'failed': self.failed,
+            'in_flight': len(self._tasks),
+            'per_sec': round(self.processed / elapsed, 1) if elapsed else 0.0
+        }
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Ошибка обработки апдейта {update.update_id}: {e}")
+        finally:
+            self._slots.release()
+
+
+class WebhookHandler:
+    """aiohttp-обработчик: проверка секрета и передача апдейта в `sink`
+
+    `sink` — UpdateDispatcher или ShardRouter (app.services.sharding):
+    любой объект с корутинами `submit(data)` и `drain()`, методом `stats()`
+    и признаком `ready`. Пока `ready` ложно, /health отвечает 503.
+    """
+
+    def __init__(self, sink, secret: str = WEBHOOK_SECRET):
+        self.sink = sink
+        self.secret = secret
+
+        # Метрики
+        self.received = 0
+        self.rejected = 0
+
+    def register(self, app: web.Application, path: str = WEBHOOK_PATH):
+        app.router.add_post(path, self.handle)
+        app.router.add_get('/health', self.health)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret):
+            self.rejected += 1
+            return web.Response(status=401)
+        try:
+            await self.sink.submit(await request.json())
+        except ValueError as e:
+            # Битый JSON или не апдейт (pydantic.ValidationError — тоже ValueError)
+            logger.warning(f"Вебхук: некорректный апдейт: {e}")
+            self.rejected += 1
+            return web.Response(status=400)
+        self.received += 1
+        return web.Response()
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats(), status=200 if self.sink.ready else 503)
+
+    def stats(self) -> dict:
+        """Метрики приёма"""
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            **self.sink.stats(),
+            'db_pool': pool_metrics.snapshot()
+        }
+
+
+async def until_stopped():
+    """Ждать SIGINT/SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: остановка через KeyboardInterrupt
+            pass
+    await stop.wait()
+
+
+async def run_webhook(
+    bot: Bot,
+    sink,
+    allowed_updates: Optional[List[str]] = None,
+    host: str = WEBHOOK_HOST,
+    port: int = WEBHOOK_PORT
+):
+    """Поднять веб-сервер и работать до SIGINT/SIGTERM"""
+    handler = WebhookHandler(sink)
+    app = web.Application()
+    handler.register(app)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Вебхук слушает http://{host}:{port}{WEBHOOK_PATH}")
+
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+            max_connections=WEBHOOK_MAX_CONNECTIONS
+        )
+        logger.info(f"Вебхук зарегистрирован: {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+    try:
+        await until_stopped()
+    finally:
+        # Сначала перестаём принимать запросы, потом дожидаемся начатых
+        await runner.cleanup()
+        await sink.drain()
+        logger.info(f"Вебхук: {handler.stats()}")
@@ -0,0 +1,52 @@
+"""
+Разбор payload команды /start и атрибуция трафика
+
+Форматы ссылок `https://t.me/<bot>?start=<payload>`:
+    ref_<user_id>               — реферальная ссылка (см. generate_referral_link)
+    <buyer_code>                — ссылка байера
+    <buyer_code>-<click_id>     — ссылка байера с click id рекламной сети
+"""
+import re
+from typing import NamedTuple, Optional
+
+from aiogram.fsm.context import FSMContext
+
+# Ключи FSM с атрибуцией: переживают отмену заявки и возврат в меню
+ATTRIBUTION_KEYS = ('referred_by', 'buyer_id', 'buyer_code', 'click_id')
+
+# Telegram ограничивает payload 64 символами A-Z, a-z, 0-9, _ и -
+_REFERRAL_RE = re.compile(r'ref_(\d{1,19})')
+_BUYER_RE = re.compile(r'([A-Za-z0-9_]{1,50})(?:-([A-Za-z0-9_-]{1,64}))?')
+
+
+class StartPayload(NamedTuple):
+    """Разобранный payload /start"""
+    referrer_id: Optional[int] = None
+    buyer_code: Optional[str] = None
+    click_id: Optional[str] = None
+
+
+def parse_start_payload(payload: Optional[str]) -> Optional[StartPayload]:
+    """Payload /start -> StartPayload или None, если он пустой или битый"""
+    if not payload or len(payload) > 64:
+        return None
+    match = _REFERRAL_RE.fullmatch(payload)
+    if match:
+        return StartPayload(referrer_id=int(match.group(1)))
+    match = _BUYER_RE.fullmatch(payload)
+    if match:
+        return StartPayload(buyer_code=match.group(1), click_id=match.group(2))
+    return None
+
+
+def get_attribution(data: dict) -> dict:
+    """Атрибуция из данных FSM"""
+    return {key: data[key] for key in ATTRIBUTION_KEYS if data.get(key) is not None}
+
+
+async def clear_state(state: FSMContext):
+    """Сбросить состояние FSM, сохранив атрибуцию"""
+    attribution = get_attribution(await state.get_data())
+    await state.clear()
+    if attribution:
+        await state.set_data(attribution)
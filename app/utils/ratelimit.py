@@ -0,0 +1,59 @@
+"""
+Ограничение частоты исходящих запросов
+"""
+import asyncio
+import time
+from typing import Dict
+
+from app.config import TELEGRAM_RATE_LIMIT
+
+
+class TokenBucket:
+    """Токен-бакет: в среднем `rate` операций в секунду, всплеск до `capacity`
+
+    Реализован через "теоретическое время прибытия" (GCRA): каждый
+    `acquire` резервирует слот и спит до него, поэтому ожидающие
+    обслуживаются по очереди и без опроса в цикле.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tat = 0.0
+
+    async def acquire(self, tokens: float = 1):
+        """Дождаться разрешения на `tokens` операций"""
+        now = time.monotonic()
+        self._tat = max(self._tat, now) + tokens / self.rate
+        delay = self._tat - now - self.capacity / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Не выдавать разрешений `seconds` секунд (ответ 429 с retry_after)"""
+        self._tat = max(self._tat, time.monotonic() + seconds + self.capacity / self.rate)
+
+
+class ChatPacer:
+    """Не чаще одного сообщения в `interval` секунд в один чат"""
+
+    # Порог, после которого из словаря вычищаются прошедшие слоты
+    MAX_CHATS = 10_000
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next: Dict[int, float] = {}
+
+    async def wait(self, chat_id: int):
+        """Дождаться своего слота в чате"""
+        now = time.monotonic()
+        if len(self._next) >= self.MAX_CHATS:
+            self._next = {chat: slot for chat, slot in self._next.items() if slot > now}
+        slot = max(self._next.get(chat_id, 0.0), now)
+        self._next[chat_id] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# Общий лимит исходящих сообщений бота (Telegram: ~30 сообщений в секунду)
+telegram_limiter = TokenBucket(TELEGRAM_RATE_LIMIT)
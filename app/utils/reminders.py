@@ -3,18 +3,43 @@
 """
 import asyncio
 import json
-from datetime import datetime
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
 from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 from app.database.queries import (
+    get_pending_reminders,
     get_unfinished_applications_for_reminder,
-    mark_reminder_sent
+    update_reminder_progress
 )
 from app.keyboards.user import InlineKeyboardMarkup, InlineKeyboardButton
-from app.config import BOT_TOKEN
+from app.cache.counters import recent_applications
+from app.config import REMINDER_SEQUENCE, REMINDER_BATCH_SIZE, REMINDER_RETRY_DELAY
+from app.utils.ratelimit import telegram_limiter
+from app.utils.scheduler import reminder_scheduler
 
+logger = logging.getLogger(__name__)
 
-async def send_reminder(bot: Bot, user_id: int, current_step: str, data: dict):
-    """Отправить напоминание пользователю"""
+
+# Тексты повторных напоминаний (2-е, 3-е, ... в REMINDER_SEQUENCE);
+# если шагов больше, чем текстов, используется последний
+FOLLOW_UP_TEMPLATES = [
+    "🔔 <b>{name}, ваше место на курсе ещё свободно</b>\n\n"
+    "Заявка заполнена не до конца — продолжите с того же шага, это займёт минуту.\n\n"
+    "🎓 <i>Обучение бесплатное, наставник поможет на каждом этапе</i>",
+    "⏳ <b>{name}, последнее напоминание</b>\n\n"
+    "Мы больше не будем беспокоить, но ваша заявка всё ещё ждёт завершения.\n\n"
+    "🚀 <i>Завершите регистрацию, пока набор открыт!</i>",
+]
+
+
+def reminder_text(reminder_step: int, current_step: str, data: dict) -> str:
+    """Текст напоминания номер `reminder_step` (с нуля) для шага формы `current_step`"""
+    if reminder_step > 0 and FOLLOW_UP_TEMPLATES:
+        template = FOLLOW_UP_TEMPLATES[min(reminder_step, len(FOLLOW_UP_TEMPLATES)) - 1]
+        return template.format(name=data.get('name', 'друг'))
     
     # Создаем персонализированное сообщение в зависимости от шага
     if current_step == "name":
@@ -49,8 +74,21 @@ async def send_reminder(bot: Bot, user_id: int, current_step: str, data: dict):
         text += "Не упустите возможность изменить свою жизнь!\n\n"
         text += "🚀 <i>Места ограничены!</i>"
     
-    # Добавляем социальное доказательство
-    text += "\n\n💬 <i>За последние 2 часа записалось 12 человек</i>"
+    return text
+
+
+async def send_reminder(bot: Bot, user_id: int, current_step: str, data: dict, reminder_step: int = 0) -> Optional[bool]:
+    """Отправить напоминание пользователю
+
+    True — отправлено, False — отправить невозможно (бот заблокирован,
+    чат не найден), None — временная ошибка, стоит повторить позже.
+    """
+    text = reminder_text(reminder_step, current_step, data)
+    
+    # Добавляем социальное доказательство из счётчика в памяти
+    joined = recent_applications.count(hours=2)
+    if joined > 0:
+        text += f"\n\n💬 <i>За последние 2 часа записалось {joined} человек(а)</i>"
     
     # Кнопка для продолжения
     keyboard = InlineKeyboardMarkup(inline_keyboard=[[
@@ -60,48 +98,110 @@ async def send_reminder(bot: Bot, user_id: int, current_step: str, data: dict):
         )
     ]])
     
-    try:
-        await bot.send_message(
-            user_id,
-            text,
-            parse_mode="HTML",
-            reply_markup=keyboard
-        )
-        
-        # Отмечаем, что напоминание отправлено
-        await mark_reminder_sent(user_id)
-        
-    except Exception as e:
-        print(f"Ошибка отправки напоминания пользователю {user_id}: {e}")
+    while True:
+        await telegram_limiter.acquire()
+        try:
+            await bot.send_message(
+                user_id,
+                text,
+                parse_mode="HTML",
+                reply_markup=keyboard
+            )
+            return True
+        except TelegramRetryAfter as e:
+            # Telegram просит подождать — притормаживаем все отправки бота
+            telegram_limiter.pause(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            print(f"Напоминание пользователю {user_id} не доставлено: {e}")
+            return False
+        except Exception as e:
+            print(f"Ошибка отправки напоминания пользователю {user_id}: {e}")
+            return None
+
 
+async def send_reminders(bot: Bot, unfinished: List) -> int:
+    """Отправить очередные напоминания пачке заявок параллельно
 
-async def check_and_send_reminders(bot: Bot):
-    """Проверить и отправить напоминания"""
+    Темп задаёт общий токен-бакет, новые шаги последовательностей
+    записываются несколькими UPDATE ... WHERE user_id IN (...).
+    Возвращает число отправленных.
+    """
+    results = await asyncio.gather(*[
+        send_reminder(
+            bot, app.user_id, app.current_step,
+            json.loads(app.data) if app.data else {},
+            app.reminder_step or 0
+        )
+        for app in unfinished
+    ])
     
-    # Получаем незавершенные заявки
-    unfinished = await get_unfinished_applications_for_reminder()
+    now = datetime.utcnow()
+    progress = []
+    for app, result in zip(unfinished, results):
+        step = app.reminder_step or 0
+        if result is None:
+            # Временная ошибка — тот же шаг ещё раз через REMINDER_RETRY_DELAY
+            next_at = now + timedelta(seconds=REMINDER_RETRY_DELAY)
+        elif result and step + 1 < len(REMINDER_SEQUENCE):
+            step += 1
+            # По расписанию от начала заполнения, но не раньше положенного интервала
+            # после этого напоминания (если пачка разбиралась с опозданием)
+            gap = REMINDER_SEQUENCE[step] - REMINDER_SEQUENCE[step - 1]
+            next_at = max(
+                (app.created_at or now) + timedelta(minutes=REMINDER_SEQUENCE[step]),
+                now + timedelta(minutes=gap)
+            )
+        else:
+            # Последовательность закончилась или пользователь недоступен
+            step, next_at = step + 1, None
+        progress.append({
+            'user_id': app.user_id,
+            'reminder_step': step,
+            'next_reminder_at': next_at,
+            'reminder_sent': next_at is None
+        })
+    await update_reminder_progress(progress)
     
-    for app in unfinished:
-        # Парсим данные
-        data = json.loads(app.data) if app.data else {}
-        
-        # Отправляем напоминание
-        await send_reminder(bot, app.user_id, app.current_step, data)
-        
-        # Небольшая задержка между отправками
-        await asyncio.sleep(1)
+    for item in progress:
+        if item['next_reminder_at'] is not None:
+            reminder_scheduler.schedule(item['user_id'], item['next_reminder_at'])
     
-    if unfinished:
-        print(f"Отправлено {len(unfinished)} напоминаний")
+    return sum(1 for result in results if result)
+
+
+async def load_reminders():
+    """Заполнить очередь напоминаний из БД (при старте)"""
+    for user_id, next_reminder_at in await get_pending_reminders():
+        reminder_scheduler.schedule(user_id, next_reminder_at)
 
 
 async def reminder_task(bot: Bot):
-    """Фоновая задача для проверки напоминаний"""
-    while True:
-        try:
-            await check_and_send_reminders(bot)
-        except Exception as e:
-            print(f"Ошибка в задаче напоминаний: {e}")
-        
-        # Проверяем каждые 5 минут
-        await asyncio.sleep(300)
+    """Фоновая задача напоминаний
+
+    Просыпается к ближайшему сроку (или раз в минуту) и разбирает
+    просроченные напоминания пачками по индексу next_reminder_at.
+    """
+    reminder_scheduler.active = True
+    try:
+        await load_reminders()
+        logger.info(f"Напоминаний в очереди: {len(reminder_scheduler)}")
+        while True:
+            await reminder_scheduler.wait()
+            try:
+                while True:
+                    started = time.monotonic()
+                    unfinished = await get_unfinished_applications_for_reminder(limit=REMINDER_BATCH_SIZE)
+                    if not unfinished:
+                        break
+                    sent = await send_reminders(bot, unfinished)
+                    if sent:
+                        print(f"Отправлено {sent} напоминаний за {time.monotonic() - started:.1f} с")
+                    if len(unfinished) < REMINDER_BATCH_SIZE:
+                        break
+            except Exception as e:
+                print(f"Ошибка в задаче напоминаний: {e}")
+                await asyncio.sleep(REMINDER_RETRY_DELAY)
+    finally:
+        # Задачу остановили (этот экземпляр больше не лидер): очередь не копим
+        reminder_scheduler.active = False
+        reminder_scheduler.clear()
@@ -0,0 +1,93 @@
+"""
+Очередь напоминаний по времени срабатывания
+"""
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+
+def _timestamp(moment: datetime) -> float:
+    """Unix-время для наивного UTC datetime (как хранится в БД)"""
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+class ReminderScheduler:
+    """Куча (время, user_id) с пробуждением к ближайшему сроку
+
+    `schedule` вызывается при сохранении незавершённой заявки, `cancel` —
+    при её завершении. Устаревшие записи кучи не удаляются, а
+    пропускаются при извлечении (актуальный срок хранится в `_due`).
+    Пока очередь не активна (напоминания шлёт другой экземпляр),
+    `schedule` ничего не делает.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}
+        self._changed = asyncio.Event()
+        self.active = False
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, user_id: int, due_at: datetime):
+        """Назначить (или перенести) напоминание пользователю"""
+        if not self.active:
+            return
+        due = _timestamp(due_at)
+        if self._due.get(user_id) == due:
+            return
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, user_id))
+        if self._heap[0] == (due, user_id):
+            self._changed.set()
+
+    def cancel(self, user_id: int):
+        """Снять напоминание"""
+        self._due.pop(user_id, None)
+
+    def clear(self):
+        """Забыть все напоминания"""
+        self._heap.clear()
+        self._due.clear()
+
+    def next_due(self) -> float:
+        """Ближайший срок (unix-время) или inf, если очередь пуста"""
+        while self._heap:
+            due, user_id = self._heap[0]
+            if self._due.get(user_id) == due:
+                return due
+            heapq.heappop(self._heap)
+        return float('inf')
+
+    async def wait(self, max_wait: float = 60):
+        """Спать до ближайшего срока, но не дольше `max_wait`
+
+        Сработавшие сроки снимаются с очереди: сами напоминания выбираются
+        из БД по индексу next_reminder_at, куча лишь подсказывает, когда
+        проснуться. Периодическое пробуждение подхватывает заявки,
+        сохранённые другими процессами.
+        """
+        deadline = time.time() + max_wait
+        while True:
+            now = time.time()
+            due = self.next_due()
+            if due <= now or now >= deadline:
+                self._drop_until(now)
+                return
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), min(due, deadline) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def _drop_until(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            due, user_id = heapq.heappop(self._heap)
+            if self._due.get(user_id) == due:
+                del self._due[user_id]
+
+
+reminder_scheduler = ReminderScheduler()
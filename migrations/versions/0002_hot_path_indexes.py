@@ -0,0 +1,62 @@
+"""Индексы для горячих запросов
+
+- напоминания: частичный индекс по created_at только для reminder_sent = false
+- applications.created_at: счётчик и лента последних заявок
+- referrals.referrer_id: количество приглашённых
+- user_actions: (user_id, created_at), session_id, created_at
+
+На PostgreSQL индексы строятся CONCURRENTLY, чтобы не блокировать запись.
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_initial
+Create Date: 2026-10-18 08:07:26.904518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_hot_path_indexes'
+down_revision: Union[str, None] = '0001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_applications_created_at', 'applications', ['created_at'], {}),
+    ('ix_referrals_referrer_id', 'referrals', ['referrer_id'], {}),
+    ('ix_unfinished_applications_reminder_due', 'unfinished_applications', ['created_at'], {
+        'postgresql_where': sa.text('reminder_sent = false'),
+        'sqlite_where': sa.text('reminder_sent = 0'),
+    }),
+    ('ix_user_actions_user_id_created_at', 'user_actions', ['user_id', 'created_at'], {}),
+    ('ix_user_actions_session_id', 'user_actions', ['session_id'], {}),
+    ('ix_user_actions_created_at', 'user_actions', ['created_at'], {}),
+]
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade() -> None:
+    if _is_postgres():
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns, kwargs in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True, if_not_exists=True, **kwargs
+                )
+        return
+
+    for name, table, columns, kwargs in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
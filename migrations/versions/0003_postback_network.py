@@ -0,0 +1,28 @@
+"""Сеть в логе постбэков
+
+Revision ID: 0003_postback_network
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_postback_network'
+down_revision: Union[str, None] = '0002_hot_path_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('postback_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('network', sa.String(length=30), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('postback_logs', schema=None) as batch_op:
+        batch_op.drop_column('network')
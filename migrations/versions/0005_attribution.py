@@ -0,0 +1,44 @@
+"""Атрибуция пользователей и заявок
+
+Revision ID: 0005_attribution
+Revises: 0004_outbox
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_attribution'
+down_revision: Union[str, None] = '0004_outbox'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('referred_by', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('buyer_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('click_id', sa.String(length=255), nullable=True))
+        batch_op.create_foreign_key('fk_users_buyer_id', 'buyers', ['buyer_id'], ['id'])
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('buyer_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('click_id', sa.String(length=255), nullable=True))
+        batch_op.create_foreign_key('fk_applications_buyer_id', 'buyers', ['buyer_id'], ['id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_applications_buyer_id', type_='foreignkey')
+        batch_op.drop_column('click_id')
+        batch_op.drop_column('buyer_id')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_users_buyer_id', type_='foreignkey')
+        batch_op.drop_column('click_id')
+        batch_op.drop_column('buyer_id')
+        batch_op.drop_column('referred_by')
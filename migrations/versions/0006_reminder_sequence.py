@@ -0,0 +1,74 @@
+"""Последовательность напоминаний: reminder_step и next_reminder_at
+
+Частичный индекс по created_at заменяется индексом по next_reminder_at.
+Для заявок, которым напоминание ещё не отправлялось, срок первого
+напоминания заполняется как created_at + 30 минут (прежняя задержка).
+
+Revision ID: 0006_reminder_sequence
+Revises: 0005_attribution
+Create Date: 2026-10-18 14:05:00.000000
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_reminder_sequence'
+down_revision: Union[str, None] = '0005_attribution'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+unfinished = sa.table(
+    'unfinished_applications',
+    sa.column('user_id', sa.BigInteger),
+    sa.column('created_at', sa.DateTime),
+    sa.column('reminder_sent', sa.Boolean),
+    sa.column('reminder_step', sa.Integer),
+    sa.column('next_reminder_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('unfinished_applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reminder_step', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_reminder_at', sa.DateTime(), nullable=True))
+        batch_op.drop_index('ix_unfinished_applications_reminder_due')
+        batch_op.create_index('ix_unfinished_applications_next_reminder_at', ['next_reminder_at'], unique=False)
+
+    bind = op.get_bind()
+    op.execute(
+        unfinished.update()
+        .where(unfinished.c.reminder_sent == sa.true())
+        .values(reminder_step=1)
+    )
+    rows = bind.execute(
+        sa.select(unfinished.c.user_id, unfinished.c.created_at)
+        .where(sa.or_(unfinished.c.reminder_sent == sa.false(), unfinished.c.reminder_sent.is_(None)))
+    ).all()
+    if rows:
+        bind.execute(
+            unfinished.update()
+            .where(unfinished.c.user_id == sa.bindparam('uid'))
+            .values(reminder_step=0, next_reminder_at=sa.bindparam('due')),
+            [
+                {'uid': user_id, 'due': (created_at or datetime.utcnow()) + timedelta(minutes=30)}
+                for user_id, created_at in rows
+            ]
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('unfinished_applications', schema=None) as batch_op:
+        batch_op.drop_index('ix_unfinished_applications_next_reminder_at')
+        batch_op.create_index(
+            'ix_unfinished_applications_reminder_due', ['created_at'], unique=False,
+            postgresql_where=sa.text('reminder_sent = false'),
+            sqlite_where=sa.text('reminder_sent = 0')
+        )
+        batch_op.drop_column('next_reminder_at')
+        batch_op.drop_column('reminder_step')
@@ -4,17 +4,36 @@
 """
 import asyncio
 import logging
+import signal
+import socket
 import sys
 from pathlib import Path
+from typing import Awaitable, List
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import SimpleEventIsolation
 from aiogram.enums import ParseMode
 
-from app.config import BOT_TOKEN
+from app.config import BOT_TOKEN, BOT_MODE, WORKERS, TELEGRAM_API_URL
 from app.handlers import register_all_handlers
-from app.database.models import init_db
+from app.middlewares import DbSessionMiddleware
+from app.database.models import init_db, engine
+from app.database.pool import pool_metrics, warm_up_pool
+from app.database.sqlite_writer import sqlite_writer
+from app.database.fsm_storage import fsm_storage
+from app.cache import cache_refresher, warm_up_caches
+from app.analytics.writer import action_writer
+from app.analytics.buyer_stats import buyer_stats
+from app.services.conversion_sender import conversion_sender
+from app.services.health import postback_health
+from app.services.outbox import outbox_processor
+from app.services.broadcast import broadcast_engine
+from app.services.leader import LeaderElection
+from app.services.webhook import UpdateDispatcher, run_webhook, until_stopped
+from app.services.sharding import ShardRouter, serve_shard, poll_updates
 from app.utils.reminders import reminder_task
 
 # Настройка логирования
@@ -28,43 +47,195 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Основная функция"""
-    # Инициализируем БД
-    logger.info("Инициализация базы данных...")
-    await init_db()
-    
-    # Создаём бота
-    bot = Bot(
+def create_bot() -> Bot:
+    """Бот с HTML по умолчанию"""
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+    return Bot(
         token=BOT_TOKEN,
+        session=session,
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML
         )
     )
+
+
+def create_dispatcher() -> Dispatcher:
+    """Диспетчер со всеми обработчиками"""
+    # Состояния FSM хранятся в БД и переживают перезапуск.
+    # Апдейты обрабатываются параллельно, поэтому апдейты одного пользователя
+    # сериализуются, чтобы шаги формы не перетирали данные друг друга
+    dp = Dispatcher(storage=fsm_storage, events_isolation=SimpleEventIsolation())
     
-    # Создаём диспетчер
-    dp = Dispatcher(storage=MemoryStorage())
+    # Одна сессия БД на апдейт
+    dp.update.middleware(DbSessionMiddleware())
     
     # Регистрируем обработчики
     register_all_handlers(dp)
+    return dp
+
+
+# Задачи лидера (см. start_leader_jobs)
+leader_tasks: List[asyncio.Task] = []
+
+
+async def start_leader_jobs(bot: Bot):
+    """Фоновые задачи, которые во всех экземплярах бота выполняет только лидер"""
+    # Запускаем отправку конверсий
+    await conversion_sender.start()
+    outbox_processor.start()
     
     # Запускаем фоновую задачу напоминаний
-    asyncio.create_task(reminder_task(bot))
+    leader_tasks.append(asyncio.create_task(reminder_task(bot)))
     logger.info("Система напоминаний запущена")
     
+    # Продолжаем рассылки, прерванные остановкой или падением экземпляра
+    leader_tasks.append(asyncio.create_task(broadcast_engine.watch(bot)))
+
+
+async def stop_leader_jobs():
+    """Остановить задачи лидера (аренда потеряна или бот останавливается)"""
+    for task in leader_tasks:
+        task.cancel()
+    await asyncio.gather(*leader_tasks, return_exceptions=True)
+    leader_tasks.clear()
+    await outbox_processor.stop()
+    await conversion_sender.stop()
+
+
+async def start_services(bot: Bot) -> LeaderElection:
+    """Запустить фоновые службы процесса"""
+    # Открываем минимум соединений с БД заранее
+    await warm_up_pool(engine)
+    # На SQLite записи хендлеров и буферов идут через одну задачу
+    sqlite_writer.start()
+
+    # Прогреваем кеши горячих путей
+    logger.info("Прогрев кешей...")
+    await warm_up_caches()
+    # Заявки других воркеров и реплик — в счётчики и индекс стран из БД
+    cache_refresher.start()
+    
+    fsm_storage.start()
+    
+    # Запускаем фоновую запись аналитики
+    action_writer.start()
+    buyer_stats.start()
+    
+    # Напоминания, outbox и рассылки — только у держателя аренды в job_leases
+    leader = LeaderElection(lambda: start_leader_jobs(bot), stop_leader_jobs)
+    leader.start()
+    return leader
+
+
+async def stop_step(name: str, step: Awaitable):
+    """Выполнить шаг остановки; ошибка не мешает следующим шагам"""
+    try:
+        await step
+    except Exception:
+        logger.exception(f"Ошибка остановки ({name})")
+
+
+async def stop_services(bot: Bot, leader: LeaderElection):
+    """Остановить фоновые службы и записать буферы
+
+    Каждый шаг выполняется, даже если предыдущий упал: у всех буферов
+    есть последняя попытка записи, писатель и HTTP-сессия закрываются.
+    """
+    await stop_step('лидер', leader.stop())
+    await stop_step('кеши', cache_refresher.stop())
+    await stop_step('рассылки', broadcast_engine.stop())
+    await stop_step('FSM', fsm_storage.close())
+    logger.info(f"FSM: {fsm_storage.stats()}")
+    logger.info(f"Конверсии: {conversion_sender.stats()}")
+    logger.info(f"Сети: {postback_health.snapshot()}")
+    await stop_step('аналитика', action_writer.stop())
+    logger.info(f"Аналитика: {action_writer.stats()}")
+    await stop_step('статистика байеров', buyer_stats.stop())
+    await stop_step('писатель SQLite', sqlite_writer.stop())
+    if sqlite_writer.enabled:
+        logger.info(f"Писатель SQLite: {sqlite_writer.stats()}")
+    logger.info(f"Пул БД: {pool_metrics.snapshot()}")
+    await stop_step('сессия бота', bot.session.close())
+
+
+async def main():
+    """Основная функция: один процесс"""
+    # Инициализируем БД
+    logger.info("Инициализация базы данных...")
+    await init_db()
+    
+    bot = create_bot()
+    dp = create_dispatcher()
+    leader = await start_services(bot)
+    
     # Запускаем бота
     try:
-        logger.info("Бот запущен!")
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot)
+        logger.info(f"Бот запущен ({BOT_MODE})!")
+        if BOT_MODE == 'webhook':
+            await run_webhook(bot, UpdateDispatcher(dp, bot), dp.resolve_used_update_types())
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
+    except Exception as e:
+        logger.error(f"Ошибка: {e}")
+    finally:
+        await stop_services(bot, leader)
+
+
+async def supervise():
+    """Маршрутизатор: принимает апдейты и раздаёт их WORKERS воркерам"""
+    logger.info("Инициализация базы данных...")
+    await init_db()
+    
+    bot = create_bot()
+    allowed_updates = create_dispatcher().resolve_used_update_types()
+    router = ShardRouter(WORKERS, worker_main)
+    await router.start()
+    
+    try:
+        logger.info(f"Бот запущен ({BOT_MODE}, воркеров: {WORKERS})!")
+        if BOT_MODE == 'webhook':
+            await run_webhook(bot, router, allowed_updates)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            polling = asyncio.create_task(poll_updates(bot, router, allowed_updates))
+            try:
+                await until_stopped()
+            finally:
+                polling.cancel()
     except Exception as e:
         logger.error(f"Ошибка: {e}")
     finally:
+        await router.stop()
+        logger.info(f"Маршрутизация: {router.stats()}")
         await bot.session.close()
 
 
+async def worker(index: int, sock: socket.socket):
+    """Воркер: обрабатывает апдейты своей доли пользователей"""
+    bot = create_bot()
+    dp = create_dispatcher()
+    # Фоновые задачи достаются воркеру, выигравшему выборы лидера
+    leader = await start_services(bot)
+    sink = UpdateDispatcher(dp, bot)
+    try:
+        await serve_shard(sock, sink)
+    finally:
+        logger.info(f"Воркер {index}: {sink.stats()}")
+        await stop_services(bot, leader)
+
+
+def worker_main(index: int, sock: socket.socket):
+    """Точка входа процесса-воркера"""
+    # Сигналы остановки обрабатывает маршрутизатор; воркер завершается,
+    # когда тот закрывает канал, и успевает записать буферы
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(worker(index, sock))
+
+
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(supervise() if WORKERS > 1 else main())
     except KeyboardInterrupt:
         logger.info("Бот остановлен")
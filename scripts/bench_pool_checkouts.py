@@ -0,0 +1,70 @@
+"""
+Сравнение количества checkout'ов из пула на один апдейт:
+отдельная сессия на каждый запрос против одной сессии на апдейт
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ.setdefault('BOT_TOKEN', '0:bench')
+os.environ.setdefault('ADMIN_ID', '1')
+os.environ.setdefault(
+    'DATABASE_URL',
+    f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+)
+
+from sqlalchemy import event
+
+from app.database.models import engine, async_session, init_db
+from app.database.queries import (
+    user_has_application,
+    save_unfinished_application,
+    get_recent_applications_count,
+    get_recent_applications
+)
+
+checkouts = 0
+
+
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    global checkouts
+    checkouts += 1
+
+
+async def form_update(user_id: int, session=None):
+    """Запросы, которые делают start_application + process_name + process_country"""
+    await user_has_application(user_id, session=session)
+    await save_unfinished_application(user_id, None, "name", {}, session=session)
+    await get_recent_applications_count(hours=1, session=session)
+    await save_unfinished_application(user_id, None, "country", {"name": "Test"}, session=session)
+    await get_recent_applications(limit=10, session=session)
+    await save_unfinished_application(user_id, None, "phone", {"name": "Test"}, session=session)
+
+
+async def measure(per_update_session: bool, updates: int = 100) -> float:
+    global checkouts
+    checkouts = 0
+    for i in range(updates):
+        if per_update_session:
+            async with async_session() as session:
+                await form_update(i, session=session)
+        else:
+            await form_update(i)
+    # Каждый form_update — это 3 апдейта (3 шага формы)
+    return checkouts / (updates * 3)
+
+
+async def main():
+    await init_db()
+    event.listen(engine.sync_engine.pool, 'checkout', on_checkout)
+    before = await measure(per_update_session=False)
+    after = await measure(per_update_session=True)
+    print(f"Checkout'ов на апдейт: до {before:.2f}, после {after:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+"""
+Нагрузка на SQLite: профиль (SQLITE_PROFILE=1) против прежнего поведения
+
+Для каждого режима `run.py` запускается в режиме вебхука на новом файле
+SQLite с заглушкой Bot API (см. bench_sharding.py). Синтетические
+пользователи проходят форму до конца (post_updates.py), `--concurrency`
+из них одновременно. Параллельно отдельный читатель раз в 20 мс делает
+SELECT из того же файла и замеряет, сколько он ждал.
+
+Печатает скорость обработки, сколько заявок дошло до базы, число ошибок
+"database is locked" в логе бота и задержку читателя.
+
+    python scripts/bench_sqlite.py --users 1000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+sys.path.append(str(Path(__file__).parent))
+
+from bench_sharding import FakeBotApi, wait_ready, ROOT, SECRET
+from post_updates import synthetic_updates, post_chain, percentile
+
+
+def read_loop(path: Path, stop: threading.Event, latencies: list, errors: Counter):
+    """Читатель в отдельном потоке: короткие SELECT, пока не остановят"""
+    db = sqlite3.connect(path, timeout=10)
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                db.execute('SELECT count(*) FROM unfinished_applications').fetchone()
+            except sqlite3.OperationalError as e:
+                errors[str(e)] += 1
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.02)
+    finally:
+        db.close()
+
+
+async def run_once(args, api: FakeBotApi, profile: bool, first_user_id: int) -> dict:
+    path = Path(tempfile.mkdtemp()) / 'bench.db'
+    port = args.port + int(profile)
+    env = {
+        **os.environ,
+        'BOT_TOKEN': '1:bench',
+        'ADMIN_ID': '1',
+        'DATABASE_URL': f"sqlite+aiosqlite:///{path}",
+        'SQLITE_PROFILE': '1' if profile else '0',
+        'BOT_MODE': 'webhook',
+        'WEBHOOK_URL': '',
+        'WEBHOOK_SECRET': SECRET,
+        'WEBHOOK_HOST': '127.0.0.1',
+        'WEBHOOK_PORT': str(port),
+        'WEBHOOK_MAX_CONCURRENCY': str(args.concurrency),
+        'WORKERS': '1',
+        'TELEGRAM_API_URL': f"http://127.0.0.1:{args.api_port}"
+    }
+    log_path = Path(tempfile.gettempdir()) / f"bench_sqlite_{int(profile)}.log"
+    log = open(log_path, 'w')
+    bot = subprocess.Popen([sys.executable, str(ROOT / 'run.py')], env=env, stdout=log, stderr=subprocess.STDOUT)
+    stop_reader = threading.Event()
+    read_latencies, read_errors = [], Counter()
+    try:
+        async with aiohttp.ClientSession() as http:
+            await wait_ready(http, f"http://127.0.0.1:{port}/health")
+            reader = asyncio.create_task(
+                asyncio.to_thread(read_loop, path, stop_reader, read_latencies, read_errors)
+            )
+            chains = list(synthetic_updates(args.users, first_user_id, complete=True))
+            updates = sum(len(chain) for chain in chains)
+            queue = asyncio.Queue()
+            for chain in chains:
+                queue.put_nowait(chain)
+
+            statuses, latencies = Counter(), []
+            url = f"http://127.0.0.1:{port}/webhook"
+            headers = {'X-Telegram-Bot-Api-Secret-Token': SECRET}
+
+            async def client():
+                while not queue.empty():
+                    await post_chain(http, url, headers, queue.get_nowait(), statuses, latencies)
+
+            api.calls = 0
+            started = time.perf_counter()
+            await asyncio.gather(*[client() for _ in range(args.concurrency)])
+            while True:
+                calls = api.calls
+                await asyncio.sleep(args.settle)
+                if api.calls == calls:
+                    break
+            elapsed = api.last_call - started
+            stop_reader.set()
+            await reader
+    finally:
+        stop_reader.set()
+        bot.send_signal(signal.SIGTERM)
+        bot.wait(timeout=120)
+        log.close()
+
+    db = sqlite3.connect(path)
+    applications = db.execute('SELECT count(*) FROM applications').fetchone()[0]
+    db.close()
+    locked = log_path.read_text(encoding='utf-8', errors='replace').count('database is locked')
+    return {
+        'rate': updates / elapsed,
+        'applications': applications,
+        'locked': locked,
+        'read_p95_ms': percentile(read_latencies, 0.95) * 1000 if read_latencies else 0.0,
+        'read_max_ms': max(read_latencies, default=0.0) * 1000,
+        'read_errors': sum(read_errors.values())
+    }
+
+
+async def main(args):
+    api = FakeBotApi()
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', args.api_port).start()
+
+    print(f"Пользователей: {args.users}, апдейтов: {args.users * 6}, одновременно: {args.concurrency}")
+    try:
+        for run, profile in enumerate((False, True)):
+            result = await run_once(args, api, profile, first_user_id=10_000_000 * (run + 1))
+            print(
+                f"{'профиль SQLite' if profile else 'как раньше    '}  "
+                f"{result['rate']:6.0f} апдейтов/с  "
+                f"заявок {result['applications']}/{args.users}  "
+                f"locked в логе {result['locked']}  "
+                f"читатель p95 {result['read_p95_ms']:.1f} мс, max {result['read_max_ms']:.1f} мс, "
+                f"ошибок {result['read_errors']}"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--settle', type=float, default=2.0, help='сколько секунд тишины считать концом прогона')
+    parser.add_argument('--port', type=int, default=8200)
+    parser.add_argument('--api-port', type=int, default=8190)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,144 @@
+"""
+Отправка апдейтов на локальный вебхук (BOT_MODE=webhook)
+
+Апдейты берутся из файла (JSON-массив или по одному JSON на строку,
+например записанные из логов) или генерируются: --synthetic N — N
+пользователей проходят /start и первые шаги формы. Печатает коды ответов,
+скорость и задержку подтверждения (p50/p95/max).
+
+    python scripts/post_updates.py updates.jsonl --secret $WEBHOOK_SECRET
+    python scripts/post_updates.py --synthetic 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import time
+from collections import Counter
+from typing import Iterator, List
+
+import aiohttp
+
+_update_ids = itertools.count(1)
+
+
+def load_updates(path: str) -> List[dict]:
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _message(user_id: int, text: str) -> dict:
+    update_id = next(_update_ids)
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test', 'language_code': 'ru'},
+        'text': text
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+def _callback(user_id: int, data: str) -> dict:
+    update_id = next(_update_ids)
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id),
+        'chat_instance': str(user_id),
+        'data': data,
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+        'message': {
+            'message_id': 1,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'text': '-'
+        }
+    }}
+
+
+def synthetic_updates(users: int, first_user_id: int = 10_000_000, complete: bool = False) -> Iterator[List[dict]]:
+    """Цепочки апдейтов по пользователям: внутри цепочки порядок важен
+
+    `complete` — пройти форму до конца (телефон и время связи), то есть
+    создать заявку.
+    """
+    for user_id in range(first_user_id, first_user_id + users):
+        chain = [
+            _message(user_id, '/start'),
+            _callback(user_id, 'start_application'),
+            _message(user_id, 'Test'),
+            _message(user_id, 'Germany')
+        ]
+        if complete:
+            chain += [
+                _message(user_id, f"+49{user_id:010d}"),
+                _callback(user_id, 'time:🌅 Утро (8:00 - 12:00)')
+            ]
+        yield chain
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def post_chain(http, url, headers, chain, statuses, latencies):
+    for update in chain:
+        started = time.perf_counter()
+        async with http.post(url, json=update, headers=headers) as response:
+            await response.read()
+            statuses[response.status] += 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def main(args):
+    if args.file:
+        # Порядок записанных апдейтов сохраняется внутри пользователя
+        chains = {}
+        for update in load_updates(args.file):
+            body = next((v for k, v in update.items() if k != 'update_id'), {})
+            user = (body.get('from') or body.get('chat') or {}).get('id')
+            chains.setdefault(user, []).append(update)
+        chains = list(chains.values())
+    else:
+        chains = list(synthetic_updates(args.synthetic))
+
+    headers = {'X-Telegram-Bot-Api-Secret-Token': args.secret} if args.secret else {}
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    queue = asyncio.Queue()
+    for chain in chains:
+        queue.put_nowait(chain)
+
+    async def worker(http):
+        while not queue.empty():
+            await post_chain(http, args.url, headers, queue.get_nowait(), statuses, latencies)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as http:
+        await asyncio.gather(*[worker(http) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - started
+
+    print(f"Апдейтов: {len(latencies)} за {elapsed:.2f} с ({len(latencies) / elapsed:.0f}/с)")
+    print(f"Ответы: {dict(statuses)}")
+    if latencies:
+        print(
+            f"Подтверждение: p50 {percentile(latencies, 0.5) * 1000:.1f} мс, "
+            f"p95 {percentile(latencies, 0.95) * 1000:.1f} мс, "
+            f"max {max(latencies) * 1000:.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', nargs='?', help='JSON или JSON lines с апдейтами')
+    parser.add_argument('--url', default='http://127.0.0.1:8080/webhook')
+    parser.add_argument('--secret', default='')
+    parser.add_argument('--synthetic', type=int, default=100, help='пользователей, если файл не задан')
+    parser.add_argument('--concurrency', type=int, default=20)
+    asyncio.run(main(parser.parse_args()))